@@ -0,0 +1,107 @@
+"""add unique place.place_id
+
+Revision ID: fe73c8e67fcc
+Revises: 37fe30a27013
+Create Date: 2026-10-18 18:30:27.914362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fe73c8e67fcc'
+down_revision: Union[str, None] = '37fe30a27013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # merge places imported more than once into the first import, moving their reactions and comments over
+    op.execute("""
+        CREATE TEMPORARY TABLE place_merge AS
+        SELECT id, first_value(id) OVER (PARTITION BY place_id ORDER BY created_at, id) AS kept_id
+        FROM place
+        WHERE place_id IN (SELECT place_id FROM place GROUP BY place_id HAVING COUNT(*) > 1)
+    """)
+    # a user keeps only the latest reaction to the merged place
+    op.execute("""
+        DELETE FROM place_reaction
+        USING place_reaction AS newer, place_merge AS merged, place_merge AS newer_merged
+        WHERE place_reaction.place_id = merged.id
+          AND newer.place_id = newer_merged.id
+          AND merged.kept_id = newer_merged.kept_id
+          AND place_reaction.user_id = newer.user_id
+          AND (place_reaction.created_at, place_reaction.id) < (newer.created_at, newer.id)
+    """)
+    op.execute("""
+        UPDATE place_reaction SET place_id = merged.kept_id
+        FROM place_merge AS merged
+        WHERE place_reaction.place_id = merged.id AND merged.id <> merged.kept_id
+    """)
+    op.execute("""
+        UPDATE place_comment SET place_id = merged.kept_id
+        FROM place_merge AS merged
+        WHERE place_comment.place_id = merged.id AND merged.id <> merged.kept_id
+    """)
+    # types and images of the duplicates go with them (ON DELETE CASCADE), the kept import has its own
+    op.execute("""
+        DELETE FROM place
+        USING place_merge AS merged
+        WHERE place.id = merged.id AND merged.id <> merged.kept_id
+    """)
+
+    # recount the denormalized data without the reactions of the removed duplicates
+    op.execute("""
+        UPDATE place
+        SET like_count = COALESCE(counts.likes, 0), dislike_count = COALESCE(counts.dislikes, 0)
+        FROM (SELECT DISTINCT kept_id FROM place_merge) AS merged
+        LEFT JOIN (
+            SELECT place_id,
+                   COUNT(*) FILTER (WHERE reaction = 'like') AS likes,
+                   COUNT(*) FILTER (WHERE reaction = 'dislike') AS dislikes
+            FROM place_reaction
+            GROUP BY place_id
+        ) AS counts ON counts.place_id = merged.kept_id
+        WHERE place.id = merged.kept_id
+    """)
+    op.execute("""
+        UPDATE "user"
+        SET like_count = COALESCE(counts.likes, 0), dislike_count = COALESCE(counts.dislikes, 0)
+        FROM "user" AS u
+        LEFT JOIN (
+            SELECT user_id,
+                   COUNT(*) FILTER (WHERE reaction = 'like') AS likes,
+                   COUNT(*) FILTER (WHERE reaction = 'dislike') AS dislikes
+            FROM place_reaction
+            GROUP BY user_id
+        ) AS counts ON counts.user_id = u.id
+        WHERE "user".id = u.id
+    """)
+    op.execute("DELETE FROM user_type_preference")
+    op.execute("""
+        INSERT INTO user_type_preference (user_id, type, score)
+        SELECT place_reaction.user_id,
+               place_type.type,
+               SUM(CASE
+                       WHEN place_reaction.reaction = 'like' THEN 1
+                       WHEN place_reaction.reaction = 'dislike' THEN -0.5
+                       ELSE 0
+                   END)
+        FROM place_reaction
+        JOIN place_type ON place_type.place_id = place_reaction.place_id
+        GROUP BY place_reaction.user_id, place_type.type
+    """)
+    op.execute("DROP TABLE place_merge")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_unique_constraint('uq_place_place_id', 'place', ['place_id'])
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_constraint('uq_place_place_id', 'place', type_='unique')
+    # ### end Alembic commands ###
@@ -0,0 +1,219 @@
+"""
+Drive a running server with a mix of the hot endpoints and report latency percentiles and throughput.
+
+Seed the database with benchmarks.seed first and start the server, then:
+
+    python -m benchmarks.load_test --users 200 --concurrency 32 --duration 60 --output bench_after.json
+    python -m benchmarks.load_test --compare bench_before.json bench_after.json
+
+Every worker thread logs in as one of the seeded users and then loops over the scenario mix for
+--duration seconds. The report is JSON with sorted keys, so reports of two commits diff cleanly.
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.seed import USER_EMAIL
+
+# scenario -> share of the requests
+SCENARIOS = {
+    "feed": 40,
+    "comments": 25,
+    "reactions": 15,
+    "reaction": 15,
+    "login": 5,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, scenario: str, response: requests.Response | None, latency: float) -> None:
+        with self._lock:
+            self.latencies[scenario].append(latency)
+            if response is None:
+                self.errors[scenario]["connection"] += 1
+            elif response.status_code >= 400:
+                self.errors[scenario][str(response.status_code)] += 1
+
+
+class Client:
+    def __init__(self, base_url: str, email: str, password: str, recorder: Recorder, rng: random.Random):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.http = requests.Session()  # keep-alive, like the mobile app
+        self.place_ids: list[str] = []  # seen in the feed, for comments and reactions
+
+    def request(self, scenario: str, method: str, path: str, **kwargs) -> requests.Response | None:
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=30, **kwargs)
+        except requests.RequestException:
+            response = None
+        self.recorder.record(scenario, response, time.perf_counter() - start)
+        return response
+
+    def login(self) -> None:
+        response = self.request("login", "POST", "/auth/login", json={"email": self.email, "password": self.password})
+        if response is not None and response.ok:
+            self.http.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    def feed(self) -> None:
+        response = self.request("feed", "GET", "/place/feed")
+        if response is not None and response.ok:
+            self.place_ids = [place["id"] for place in response.json()] or self.place_ids
+
+    def comments(self) -> None:
+        if self.place_ids:
+            self.request("comments", "GET", "/place/comments", params={"place_id": self.rng.choice(self.place_ids)})
+
+    def reactions(self) -> None:
+        self.request("reactions", "GET", "/place/reactions", params={"limit": 20})
+
+    def reaction(self) -> None:
+        if self.place_ids:
+            place_id = self.place_ids.pop()
+            reaction = "like" if self.rng.random() < 0.7 else "dislike"
+            self.request("reaction", "POST", "/place/reaction", json={"place_id": place_id, "reaction": reaction})
+
+
+def run_worker(client: Client, deadline: float) -> None:
+    client.login()
+    client.feed()
+    scenarios, weights = zip(*SCENARIOS.items())
+    while time.monotonic() < deadline:
+        scenario = client.rng.choices(scenarios, weights=weights)[0]
+        getattr(client, scenario)()
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    # nearest rank
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: dict[str, int], duration: float) -> dict:
+    values = sorted(latencies)
+    if not values:
+        return {"requests": 0}
+    return {
+        "requests": len(values),
+        "errors": dict(sorted(errors.items())),
+        "throughput_rps": round(len(values) / duration, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    warmup = Recorder()
+    clients = [
+        Client(args.base_url, USER_EMAIL.format(n % args.users), args.password, warmup, random.Random(rng.random()))
+        for n in range(args.concurrency)
+    ]
+
+    measure_after = time.monotonic() + args.warmup
+    deadline = measure_after + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_worker, client, deadline) for client in clients]
+        # requests finishing during the warmup (including the logins) are not reported
+        time.sleep(args.warmup)
+        measured = Recorder()
+        for client in clients:
+            client.recorder = measured
+        for future in futures:
+            future.result()
+    duration = time.monotonic() - measure_after
+
+    all_latencies = [latency for latencies in measured.latencies.values() for latency in latencies]
+    all_errors: dict[str, int] = defaultdict(int)
+    for errors in measured.errors.values():
+        for status, count in errors.items():
+            all_errors[status] += count
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "scenarios": SCENARIOS,
+        },
+        "total": summarize(all_latencies, all_errors, duration),
+        "endpoints": {
+            scenario: summarize(measured.latencies[scenario], measured.errors[scenario], duration)
+            for scenario in sorted(measured.latencies)
+        },
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as file:
+        before = json.load(file)
+    with open(after_path) as file:
+        after = json.load(file)
+
+    print(f"{'endpoint':<12}{'metric':<16}{before.get('commit') or 'before':>12}{after.get('commit') or 'after':>12}"
+          f"{'change':>10}")
+    rows = [("total", before["total"], after["total"])] + [
+        (name, before["endpoints"].get(name, {}), after["endpoints"].get(name, {}))
+        for name in sorted(set(before["endpoints"]) | set(after["endpoints"]))
+    ]
+    for name, old, new in rows:
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if metric in old and metric in new:
+                change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+                print(f"{name:<12}{metric:<16}{old[metric]:>12.2f}{new[metric]:>12.2f}{change:>+9.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--users", type=int, default=100, help="seeded users to log in as")
+    parser.add_argument("--password", default="benchmark", help="password the users were seeded with")
+    parser.add_argument("--concurrency", type=int, default=16, help="worker threads, one user session each")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds before measuring starts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        report = run(args)
+        print(json.dumps(report, indent=2, sort_keys=True))
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(report, file, indent=2, sort_keys=True)
@@ -0,0 +1,123 @@
+"""
+Capture the query plans of the hot queries against the configured database.
+
+Run it before and after `alembic upgrade head` and diff the two outputs:
+
+    python -m benchmarks.query_plans --output plans_before.json
+    alembic upgrade head
+    python -m benchmarks.query_plans --output plans_after.json
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import select, func, desc, text, Select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import sessionmanager
+from src.models import PlaceModel, PlaceReactionModel, PlaceTypeModel, PlaceCommentModel
+from src.place import service
+from src.place.constants import COMMON_TYPES
+
+
+async def build_queries(db_session: AsyncSession) -> dict[str, Select]:
+    # the heaviest swiper and the most commented place are the worst cases
+    user_id = (await db_session.execute(
+        select(PlaceReactionModel.user_id)
+        .group_by(PlaceReactionModel.user_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )).scalar()
+    place_id = (await db_session.execute(
+        select(PlaceCommentModel.place_id)
+        .group_by(PlaceCommentModel.place_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )).scalar()
+
+    queries = {
+        "reaction_count": (
+            select(func.count())
+            .select_from(PlaceReactionModel)
+            .filter(PlaceReactionModel.user_id == user_id)
+        ),
+        "user_reactions": (
+            select(PlaceModel, PlaceReactionModel)
+            .join(PlaceReactionModel)
+            .filter(PlaceReactionModel.user_id == user_id)
+            .order_by(desc(PlaceReactionModel.created_at))
+            .limit(100)
+        ),
+        "type_counts": (
+            select(PlaceTypeModel.type, func.count())
+            .group_by(PlaceTypeModel.type)
+            .filter(~PlaceTypeModel.type.in_(COMMON_TYPES))
+        ),
+        "top_rated": (
+            select(PlaceModel)
+            .filter(~PlaceModel.reactions.any(PlaceReactionModel.user_id == user_id))
+            .order_by(*service.TOP_RATED_ORDER)
+            .limit(10)
+        ),
+        "comments": (
+            select(PlaceCommentModel)
+            .where(PlaceCommentModel.place_id == place_id)
+            .order_by(desc(PlaceCommentModel.created_at))
+            .limit(10)
+        ),
+    }
+    if user_id is not None:
+        queries["feed"] = await service.build_feed_query(db_session, user_id, [], 10)
+    return queries
+
+
+async def explain(db_session: AsyncSession, query: Select) -> dict:
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await db_session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def plan_nodes(plan: dict) -> list[str]:
+    """
+    Flatten the plan tree into "Node Type on relation using index" lines.
+    """
+    line = plan["Node Type"]
+    if "Relation Name" in plan:
+        line += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        line += f" using {plan['Index Name']}"
+
+    lines = [line]
+    for child in plan.get("Plans", []):
+        lines.extend("  " + child_line for child_line in plan_nodes(child))
+    return lines
+
+
+async def main(output: str | None) -> None:
+    report = {}
+    async with sessionmanager.session() as db_session:
+        for name, query in (await build_queries(db_session)).items():
+            plan = await explain(db_session, query)
+            report[name] = {
+                "execution_time_ms": plan["Execution Time"],
+                "planning_time_ms": plan["Planning Time"],
+                "plan": plan_nodes(plan["Plan"]),
+            }
+            print(f"{name}: {plan['Execution Time']:.2f} ms")
+            print("\n".join("    " + line for line in report[name]["plan"]))
+    await sessionmanager.close()
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the plans to this JSON file")
+    args = parser.parse_args()
+    asyncio.run(main(args.output))
@@ -0,0 +1,98 @@
+"""
+Compare the response encoding of JSONResponse and ORJSONResponse on feed sized payloads.
+
+No database is needed, the places are synthetic PlaceScheme objects shaped like the real ones:
+
+    python -m benchmarks.response_encoding
+    python -m benchmarks.response_encoding --places 10 100 500 --number 200
+
+Every case runs what FastAPI does for a route with response_model=list[PlaceMin]: validate the
+returned objects, serialize them to JSON compatible data and render the response body. The
+validation and serialization (the "pydantic" column) are the same for both classes.
+"""
+import argparse
+import asyncio
+import json
+import random
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.place.schemas import PlaceMin
+from src.schemas import PlaceScheme
+
+TYPES = ["restaurant", "cafe", "bar", "museum", "park", "tourist_attraction", "establishment", "point_of_interest"]
+
+
+def generate_places(rng: random.Random, count: int) -> list[PlaceScheme]:
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    places = []
+    for n in range(count):
+        place_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        created_at = (now - timedelta(seconds=rng.uniform(0, 90 * 86400))).replace(tzinfo=None)
+        places.append(PlaceScheme(
+            id=place_id,
+            name=f"Place {n}",
+            place_id=f"ChIJ{rng.getrandbits(64):016x}",
+            latitude=round(rng.uniform(-90, 90), 7),
+            longitude=round(rng.uniform(-180, 180), 7),
+            created_at=created_at,
+            user_rating=Decimal(f"{rng.uniform(0, 5):.2f}"),
+            user_rating_count=rng.randint(0, 500),
+            types=[
+                {"place_id": place_id, "type": type_name, "created_at": created_at}
+                for type_name in rng.sample(TYPES, 4)
+            ],
+            images=[
+                {"place_id": place_id, "image_url": f"https://images.example.com/places/{place_id}/{i}.jpg",
+                 "created_at": created_at}
+                for i in range(rng.randint(1, 5))
+            ],
+            reactions=[{"id": uuid.UUID(int=rng.getrandbits(128), version=4), "reaction": "like", "created_at": now}],
+            distance_km=rng.uniform(0, 10),
+        ))
+    return places
+
+
+def measure(func, number: int) -> float:
+    # best of 5, in milliseconds per call
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+
+
+def run(places_counts: list[int], number: int, seed: int) -> None:
+    field = create_model_field(name="Response", type_=list[PlaceMin], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    print(f"{'places':>8}{'pydantic':>12}{'json':>12}{'orjson':>12}{'speedup':>10}{'bytes':>10}")
+    for count in places_counts:
+        places = generate_places(random.Random(seed), count)
+        content = loop.run_until_complete(serialize_response(field=field, response_content=places))
+
+        json_body = JSONResponse(content).body
+        orjson_body = ORJSONResponse(content).body
+        if json.loads(json_body) != json.loads(orjson_body):
+            raise AssertionError("ORJSONResponse renders a different document than JSONResponse")
+
+        pydantic = measure(lambda: loop.run_until_complete(
+            serialize_response(field=field, response_content=places)), number)
+        json_render = measure(lambda: JSONResponse(content), number)
+        orjson_render = measure(lambda: ORJSONResponse(content), number)
+        print(f"{count:>8}{pydantic:>10.3f}ms{json_render:>10.3f}ms{orjson_render:>10.3f}ms"
+              f"{json_render / orjson_render:>9.1f}x{len(orjson_body):>10}")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, nargs="+", default=[10, 100, 500], help="places per response")
+    parser.add_argument("--number", type=int, default=100, help="encodings per measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run(args.places, args.number, args.seed)
@@ -0,0 +1,262 @@
+"""
+Seed a local database with a reproducible synthetic dataset for the load test.
+
+Users, places (with types and images), reactions and comments are generated from a fixed random
+seed. Reactions and comments follow power laws: a few users react a lot and a few places get most
+of the attention, like in production. Run it against a migrated database, e.g. the postgres
+service from docker-compose.yml:
+
+    docker compose up -d postgres
+    alembic upgrade head
+    python -m benchmarks.seed --users 2000 --places 50000 --reactions 500000 --comments 50000
+
+Every seeded user has the email bench-<n>@example.com and the password of --password.
+--reset removes a previous seeded dataset (and nothing else) first.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import accumulate
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+
+from src.auth.hashing import ph
+from src.database import sessionmanager
+from src.models import UserModel, PlaceModel, PlaceTypeModel, PlaceImageModel, PlaceReactionModel, \
+    PlaceCommentModel
+from src.place.images import get_image_source_ids
+from src.place.importer import batched
+
+USER_EMAIL = "bench-{}@example.com"
+PLACE_ID_PREFIX = "bench:"
+IMAGE_BASE_URL = "https://images.example.com/bench/"
+
+# every place has these, like in the google places data
+BASE_TYPES = ["establishment", "point_of_interest"]
+SPECIFIC_TYPES = [
+    "restaurant", "cafe", "bar", "museum", "park", "tourist_attraction", "lodging", "store", "church",
+    "art_gallery", "night_club", "bakery", "zoo", "aquarium", "amusement_park", "library", "stadium",
+    "shopping_mall", "spa", "gym", "movie_theater", "casino", "bowling_alley", "campground", "beach",
+    "viewpoint", "castle", "monument", "memorial", "ruins", "garden", "theatre", "marketplace",
+    "synagogue", "mosque", "hindu_temple", "lighthouse", "waterfall", "hiking_trail", "winery",
+]
+CITIES = [
+    (52.3676, 4.9041), (48.8566, 2.3522), (41.9028, 12.4964), (40.4168, -3.7038), (51.5072, -0.1276),
+    (52.5200, 13.4050), (50.0755, 14.4378), (38.7223, -9.1393), (59.3293, 18.0686), (35.6762, 139.6503),
+]
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def new_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def generate_users(rng: random.Random, count: int, password_hash: str) -> list[dict]:
+    return [
+        {"id": new_uuid(rng), "name": f"Bench User {n}", "email": USER_EMAIL.format(n), "password": password_hash}
+        for n in range(count)
+    ]
+
+
+def generate_places(rng: random.Random, count: int) -> tuple[list[dict], list[dict], list[dict]]:
+    places, types, images = [], [], []
+    type_weights = list(accumulate(zipf_weights(len(SPECIFIC_TYPES), 1.0)))
+    for n in range(count):
+        latitude, longitude = rng.choice(CITIES)
+        place = {
+            "id": new_uuid(rng),
+            "place_id": f"{PLACE_ID_PREFIX}{n}",
+            "name": f"Bench Place {n}",
+            # within ~20 km of a city center
+            "latitude": round(latitude + rng.uniform(-0.2, 0.2), 7),
+            "longitude": round(longitude + rng.uniform(-0.3, 0.3), 7),
+            "rating": Decimal(f"{rng.uniform(1, 5):.2f}") if rng.random() < 0.7 else None,
+        }
+        places.append(place)
+
+        place_types = set(rng.choices(SPECIFIC_TYPES, cum_weights=type_weights, k=rng.randint(1, 3)))
+        types.extend({"place_id": place["id"], "type": type_name} for type_name in BASE_TYPES + sorted(place_types))
+        images.extend(
+            {"place_id": place["id"], "image_key": f"{n}/{i}.jpg", "position": i}
+            for i in range(rng.randint(1, 4))
+        )
+    return places, types, images
+
+
+def generate_reactions(rng: random.Random, users: list[dict], places: list[dict], count: int,
+                       now: datetime) -> list[dict]:
+    # a power law over users for how many reactions each makes, and over places for which ones get them
+    user_weights = zipf_weights(len(users), 1.0)
+    total_weight = sum(user_weights)
+    place_weights = list(accumulate(zipf_weights(len(places), 0.8)))
+    popularity = places[:]
+    rng.shuffle(popularity)
+
+    reactions = []
+    for user, weight in zip(users, user_weights):
+        wanted = min(max(1, round(count * weight / total_weight)), len(places) // 2)
+        sampled = rng.choices(popularity, cum_weights=place_weights, k=wanted * 2)
+        reacted = list({place["id"]: place for place in sampled}.values())[:wanted]
+        reactions.extend(
+            {
+                "id": new_uuid(rng),
+                "user_id": user["id"],
+                "place_id": place["id"],
+                "reaction": "like" if rng.random() < 0.7 else "dislike",
+                "created_at": (now - timedelta(seconds=rng.uniform(0, 90 * 86400))).replace(tzinfo=None),
+            }
+            for place in reacted
+        )
+    return reactions
+
+
+def generate_comments(rng: random.Random, users: list[dict], places: list[dict], count: int,
+                      now: datetime) -> list[dict]:
+    popularity = places[:]
+    rng.shuffle(popularity)
+    commented = rng.choices(popularity, cum_weights=list(accumulate(zipf_weights(len(places), 1.1))), k=count)
+    return [
+        {
+            "id": new_uuid(rng),
+            "place_id": place["id"],
+            "user_id": rng.choice(users)["id"],
+            "comment": f"Benchmark comment {n} " + "lorem ipsum " * rng.randint(1, 30),
+            "rating": Decimal(rng.randint(0, 10)) / 2,
+            "created_at": now - timedelta(seconds=rng.uniform(0, 90 * 86400)),
+        }
+        for n, place in enumerate(commented)
+    ]
+
+
+async def insert_rows(model, rows: list[dict]) -> None:
+    if not rows:
+        return
+    async with sessionmanager.session() as db_session:
+        for chunk in batched(rows, len(rows[0])):
+            await db_session.execute(insert(model).values(chunk))
+        await db_session.commit()
+
+
+async def reset() -> None:
+    # reactions, comments, types, images, preferences and candidates go with them
+    async with sessionmanager.session() as db_session:
+        await db_session.execute(delete(PlaceModel).where(PlaceModel.place_id.startswith(PLACE_ID_PREFIX)))
+        await db_session.execute(delete(UserModel).where(UserModel.email.like(USER_EMAIL.format("%"))))
+        await db_session.commit()
+
+
+async def update_aggregates() -> None:
+    """
+    Fill the denormalized counters, preferences and rating aggregates of the seeded rows,
+    which the application would otherwise maintain on every write.
+    """
+    async with sessionmanager.session() as db_session:
+        await db_session.execute(text("""
+            UPDATE "user"
+            SET like_count = counts.likes, dislike_count = counts.dislikes
+            FROM (
+                SELECT user_id,
+                       COUNT(*) FILTER (WHERE reaction = 'like') AS likes,
+                       COUNT(*) FILTER (WHERE reaction = 'dislike') AS dislikes
+                FROM place_reaction
+                GROUP BY user_id
+            ) AS counts
+            WHERE "user".id = counts.user_id AND "user".email LIKE :email
+        """), {"email": USER_EMAIL.format("%")})
+        await db_session.execute(text("""
+            UPDATE place
+            SET like_count = counts.likes, dislike_count = counts.dislikes
+            FROM (
+                SELECT place_id,
+                       COUNT(*) FILTER (WHERE reaction = 'like') AS likes,
+                       COUNT(*) FILTER (WHERE reaction = 'dislike') AS dislikes
+                FROM place_reaction
+                GROUP BY place_id
+            ) AS counts
+            WHERE place.id = counts.place_id AND place.place_id LIKE :place_id
+        """), {"place_id": PLACE_ID_PREFIX + "%"})
+        await db_session.execute(text("""
+            UPDATE place
+            SET user_rating_count = ratings.count, user_rating_sum = ratings.sum
+            FROM (
+                SELECT place_id, COUNT(rating) AS count, COALESCE(SUM(rating), 0) AS sum
+                FROM place_comment
+                GROUP BY place_id
+            ) AS ratings
+            WHERE place.id = ratings.place_id AND place.place_id LIKE :place_id
+        """), {"place_id": PLACE_ID_PREFIX + "%"})
+        await db_session.execute(text("""
+            INSERT INTO user_type_preference (user_id, type, score)
+            SELECT place_reaction.user_id,
+                   place_type.type,
+                   SUM(CASE
+                           WHEN place_reaction.reaction = 'like' THEN 1
+                           WHEN place_reaction.reaction = 'dislike' THEN -0.5
+                           ELSE 0
+                       END)
+            FROM place_reaction
+            JOIN "user" ON "user".id = place_reaction.user_id
+            JOIN place_type ON place_type.place_id = place_reaction.place_id
+            WHERE "user".email LIKE :email
+            GROUP BY place_reaction.user_id, place_type.type
+        """), {"email": USER_EMAIL.format("%")})
+        await db_session.commit()
+
+
+async def seed(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    # fixed, so that reseeding produces the same timestamps relative to each other
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    start = time.perf_counter()
+
+    try:
+        if args.reset:
+            await reset()
+            print("Removed the previous benchmark dataset")
+
+        # one hash for everyone, hashing thousands of passwords would dominate the seeding time
+        users = generate_users(rng, args.users, ph.hash(args.password))
+        places, types, images = generate_places(rng, args.places)
+        reactions = generate_reactions(rng, users, places, args.reactions, now)
+        comments = generate_comments(rng, users, places, args.comments, now)
+        print(f"Generated {len(users)} users, {len(places)} places, {len(reactions)} reactions "
+              f"and {len(comments)} comments in {time.perf_counter() - start:.1f}s")
+
+        # the images share one source, like the images of a real host
+        async with sessionmanager.session() as db_session:
+            source_id = (await get_image_source_ids(db_session, {IMAGE_BASE_URL}))[IMAGE_BASE_URL]
+            await db_session.commit()
+        for image in images:
+            image["source_id"] = source_id
+
+        for model, rows in (
+                (UserModel, users), (PlaceModel, places), (PlaceTypeModel, types), (PlaceImageModel, images),
+                (PlaceReactionModel, reactions), (PlaceCommentModel, comments),
+        ):
+            await insert_rows(model, rows)
+            print(f"Inserted {len(rows)} rows into {model.__tablename__}")
+
+        await update_aggregates()
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--places", type=int, default=20000)
+    parser.add_argument("--reactions", type=int, default=100000, help="approximate total")
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed, the same seed gives the same dataset")
+    parser.add_argument("--password", default="benchmark", help="password of every seeded user")
+    parser.add_argument("--reset", action="store_true", help="remove a previously seeded dataset first")
+    asyncio.run(seed(parser.parse_args()))
@@ -1,8 +1,12 @@
+import uuid
 from typing import Annotated
 
 from fastapi import Depends
 
 from src.schemas import UserSchemeDetailed
-from src.auth.service import get_current_user
+from src.auth.service import get_current_user, get_current_user_id
 
+# full user with reaction stats
 CurrentUserDep = Annotated[UserSchemeDetailed, Depends(get_current_user)]
+# id of the user, usually confirmed from the user cache
+CurrentUserIdDep = Annotated[uuid.UUID, Depends(get_current_user_id)]
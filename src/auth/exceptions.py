@@ -19,3 +19,8 @@ class UserDoesntExist(HTTPException):
 class InvalidPassword(HTTPException):
     def __init__(self, detail: str = "Invalid password", status_code: int = 400):
         super().__init__(status_code=status_code, detail=detail)
+
+
+class PasswordHashingBusy(HTTPException):
+    def __init__(self, detail: str = "Too many authentication requests, try again later", status_code: int = 503):
+        super().__init__(status_code=status_code, detail=detail)
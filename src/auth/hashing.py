@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+
+from src import config
+from src.auth.exceptions import PasswordHashingBusy
+from src.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_WAIT, PASSWORD_HASH_REJECTED
+
+ph = PasswordHasher(
+    time_cost=config.ARGON2_TIME_COST,
+    memory_cost=config.ARGON2_MEMORY_COST,
+    parallelism=config.ARGON2_PARALLELISM,
+    hash_len=config.ARGON2_HASH_LEN,
+    salt_len=config.ARGON2_SALT_LEN,
+)
+
+
+# module level functions, so they can be sent to worker processes
+def _hash(password: str) -> str:
+    return ph.hash(password)
+
+
+def _verify(hashed_password: str, password: str) -> bool:
+    return ph.verify(hashed_password, password)
+
+
+class PasswordHashingPool:
+    """
+    Runs argon2 hashing outside the event loop, with a bounded number of concurrent hashes
+    and a bounded queue of requests waiting for a free worker.
+    """
+
+    def __init__(self, executor: str, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue  # 0 means unbounded
+        if executor == "process":
+            self._executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            # argon2-cffi releases the GIL while hashing, so threads run in parallel
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+        self._semaphore = asyncio.Semaphore(max_workers)
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, operation: str, func, *args):
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHashingBusy()
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        PASSWORD_HASH_WAIT.observe(time.perf_counter() - start)
+
+        self.running += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - start)
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, hashed_password: str, password: str) -> bool:
+        """
+        Raises the argon2 verification exceptions just like PasswordHasher.verify.
+        """
+        return await self._run("verify", _verify, hashed_password, password)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHashingPool(
+    config.PASSWORD_HASH_EXECUTOR,
+    config.PASSWORD_HASH_WORKERS,
+    config.PASSWORD_HASH_MAX_QUEUE,
+)
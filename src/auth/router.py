@@ -2,7 +2,7 @@ from typing import Dict
 
 from fastapi import APIRouter
 
-from src.auth.dependencies import CurrentUserDep
+from src.auth.dependencies import CurrentUserDep, CurrentUserIdDep
 from src.auth.schemas import RegisterData, LoginData, Token, PasswordData
 from src.auth.exceptions import UserAlreadyExists, InvalidPassword
 from src.auth import service
@@ -54,8 +54,8 @@ async def get_me(
 )
 async def get_me(
         password_data: PasswordData,
-        user: CurrentUserDep,
+        user_id: CurrentUserIdDep,
         db_session: DBSessionDep
 ) -> dict:
-    await service.update_password(db_session, user, password_data)
+    await service.update_password(db_session, user_id, password_data)
     return {"success": True}
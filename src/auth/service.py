@@ -4,15 +4,16 @@ import jwt
 import uuid
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select, case, func, update
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from src import config
-from argon2 import PasswordHasher
 from src.auth.exceptions import UserDoesntExist, InvalidPassword
+from src.auth.hashing import password_pool
 from src.auth.schemas import RegisterData, PasswordData
-from src.database import get_db_session
+from src.cache import TTLCache
+from src.database import get_db_session, get_read_db_session
 from src.exceptions import InvalidCredentials, TokenExpired
-from src.models import UserModel, PlaceReactionModel
+from src.models import UserModel
 from typing import Annotated
 
 from src.schemas import UserSchemeDetailed
@@ -22,15 +23,16 @@ oauth2_bearer = OAuth2PasswordBearer(
     scheme_name="JWT"
 )
 
-ph = PasswordHasher()
+# ids of recently authenticated users that exist, never the user records with their password hashes
+user_cache = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
 
 
-def verify_password(plain_password, hashed_password) -> bool:
+async def verify_password(plain_password, hashed_password) -> bool:
     """
     Verify if the provided plain text password matches the hashed password.
     """
     try:
-        return ph.verify(hashed_password, plain_password)
+        return await password_pool.verify(hashed_password, plain_password)
     except (
             argon2.exceptions.VerifyMismatchError, argon2.exceptions.VerificationError,
             argon2.exceptions.InvalidHashError):
@@ -44,7 +46,7 @@ async def user_exists(db_session: AsyncSession, email: str) -> bool:
 
 async def validate_user(db_session: AsyncSession, email: str, password: str) -> str:
     user = await get_user_by_email(db_session, email)
-    if verify_password(password, user.password):
+    if await verify_password(password, user.password):
         return create_access_token(user.id)
 
 
@@ -52,12 +54,10 @@ async def get_user_by_id(db_session: AsyncSession, user_id: uuid.UUID) -> UserSc
     query = (
         select(
             UserModel,
-            func.count(case((PlaceReactionModel.reaction == 'like', 1), else_=None)).label('likes'),
-            func.count(case((PlaceReactionModel.reaction == 'dislike', 1), else_=None)).label('dislikes')
+            UserModel.like_count.label('likes'),
+            UserModel.dislike_count.label('dislikes')
         )
-        .outerjoin(PlaceReactionModel, UserModel.id == PlaceReactionModel.user_id)
         .where(UserModel.id == user_id)
-        .group_by(UserModel.id)
     )
 
     result = await db_session.execute(query)
@@ -79,12 +79,10 @@ async def get_user_by_email(db_session: AsyncSession, user_email: str) -> UserSc
     query = (
         select(
             UserModel,
-            func.count(case((PlaceReactionModel.reaction == 'like', 1), else_=None)).label('likes'),
-            func.count(case((PlaceReactionModel.reaction == 'dislike', 1), else_=None)).label('dislikes')
+            UserModel.like_count.label('likes'),
+            UserModel.dislike_count.label('dislikes')
         )
-        .outerjoin(PlaceReactionModel, UserModel.id == PlaceReactionModel.user_id)
         .where(UserModel.email == user_email)
-        .group_by(UserModel.id)
     )
 
     result = await db_session.execute(query)
@@ -110,46 +108,68 @@ def create_access_token(user_id: uuid.UUID, expiry_time: int = config.JWT_EXPIRY
     return encoded_jwt
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)],
-                           db_session: AsyncSession = Depends(get_db_session)) -> UserSchemeDetailed:
+def decode_access_token(token: str) -> uuid.UUID:
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.JWT_ALGORITHM])
         user_id = uuid.UUID(payload.get("sub"))
         if user_id is None:
             raise InvalidCredentials()
-        return await get_user_by_id(db_session, user_id)
+        return user_id
     except jwt.exceptions.ExpiredSignatureError:
         raise TokenExpired()
     except jwt.exceptions.DecodeError:
         raise InvalidCredentials()
-    except ValueError:
+    except (ValueError, TypeError):
         raise InvalidCredentials()
 
 
+async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)],
+                           db_session: AsyncSession = Depends(get_read_db_session)) -> UserSchemeDetailed:
+    user_id = decode_access_token(token)
+    return await get_user_by_id(db_session, user_id)
+
+
+async def get_current_user_id(token: Annotated[str, Depends(oauth2_bearer)],
+                              db_session: AsyncSession = Depends(get_db_session)) -> uuid.UUID:
+    """
+    Get the id of the authenticated user, confirmed from the user cache when possible.
+    """
+    user_id = decode_access_token(token)
+    if user_cache.get(user_id) is None:
+        if await db_session.scalar(select(UserModel.id).where(UserModel.id == user_id)) is None:
+            raise UserDoesntExist()
+        user_cache.set(user_id, True)
+
+    return user_id
+
+
 async def create_user(db_session: AsyncSession, register_data: RegisterData) -> UserSchemeDetailed:
     db_user = UserModel(
         name=register_data.name,
         email=register_data.email,
-        password=ph.hash(register_data.password)
+        password=await password_pool.hash(register_data.password)
     )
     db_session.add(db_user)
     await db_session.commit()
     await db_session.refresh(db_user)
+    # the request has no token yet, the first reads with the new one must still find the user
+    db_session.info["writer"] = str(db_user.id)
     return UserSchemeDetailed.model_validate(db_user)
 
 
-async def update_password(db_session: AsyncSession, user: UserSchemeDetailed, password_data: PasswordData) -> UserSchemeDetailed:
-    if not verify_password(password_data.current_password, user.password):
+async def update_password(db_session: AsyncSession, user_id: uuid.UUID, password_data: PasswordData) -> None:
+    # the current hash is read from the primary on every change, it is never cached
+    hashed_password = await db_session.scalar(select(UserModel.password).where(UserModel.id == user_id))
+    if hashed_password is None:
+        raise UserDoesntExist()
+    if not await verify_password(password_data.current_password, hashed_password):
         raise InvalidPassword()
 
-    new_hashed_password = ph.hash(password_data.new_password)
+    new_hashed_password = await password_pool.hash(password_data.new_password)
     stmt = (
         update(UserModel)
-        .where(UserModel.id == user.id)
+        .where(UserModel.id == user_id)
         .values(password=new_hashed_password)
     )
     await db_session.execute(stmt)
     await db_session.commit()
-
-    user.password = new_hashed_password
-    return user
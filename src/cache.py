@@ -0,0 +1,102 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Protocol
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU mapping whose entries expire `ttl` seconds after they were set.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(Protocol):
+    """
+    Async string key-value store behind the response caches, shared between workers or not.
+    """
+
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    async def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        self._cache.pop(key)
+
+
+class RedisCacheBackend:
+    def __init__(self, url: str, ttl: float):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("A redis:// cache backend requires the redis package")
+
+        self._redis = redis.from_url(url)
+        self._ttl = math.ceil(ttl)
+
+    async def get(self, key: str) -> str | None:
+        value = await self._redis.get(key)
+        return None if value is None else value.decode()
+
+    async def set(self, key: str, value: str) -> None:
+        await self._redis.set(key, value, ex=self._ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+
+def create_cache_backend(url: str | None, maxsize: int, ttl: float) -> CacheBackend:
+    """
+    Shared backend for a redis:// url, in-process LRU otherwise.
+    """
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url, ttl)
+    if url:
+        raise ValueError(f"Unsupported cache backend url: {url}")
+    return MemoryCacheBackend(maxsize, ttl)
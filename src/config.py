@@ -7,11 +7,107 @@ DATABASE_USERNAME = os.getenv("DATABASE_USERNAME", "username")
 DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "vacation-vibes")
 DATABASE_URL = f"postgresql+asyncpg://{DATABASE_USERNAME}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "false").lower() == "true"
+
+# connection pool configuration
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", 1800))  # seconds, -1 never recycles
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+# prepared statements cached per connection, set to 0 behind pgbouncer in transaction mode
+DATABASE_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", 100))
+DATABASE_COMMAND_TIMEOUT = float(os.getenv("DATABASE_COMMAND_TIMEOUT", 60))  # seconds, client side
+DATABASE_STATEMENT_TIMEOUT = int(os.getenv("DATABASE_STATEMENT_TIMEOUT", 30_000))  # ms, server side, 0 disables
+DATABASE_IDLE_IN_TRANSACTION_TIMEOUT = int(os.getenv("DATABASE_IDLE_IN_TRANSACTION_TIMEOUT", 60_000))  # ms
+
+# read replicas, comma separated hosts, read-only endpoints use the primary when empty
+DATABASE_REPLICA_HOSTS = [host.strip() for host in os.getenv("DATABASE_REPLICA_HOSTS", "").split(",") if host.strip()]
+DATABASE_REPLICA_URLS = [
+    f"postgresql+asyncpg://{DATABASE_USERNAME}:{DATABASE_PASSWORD}@{host}/{DATABASE_NAME}"
+    for host in DATABASE_REPLICA_HOSTS
+]
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", 5))  # seconds behind the primary
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_LAG_CHECK_INTERVAL", 5))  # seconds
+DATABASE_REPLICA_RETRY_AFTER = float(os.getenv("DATABASE_REPLICA_RETRY_AFTER", 30))  # seconds a failed replica is skipped
+# seconds after a write during which the writer's reads go to the primary
+DATABASE_READ_YOUR_WRITES_WINDOW = float(os.getenv("DATABASE_READ_YOUR_WRITES_WINDOW", 10))
 
 # JWT configuration
 SECRET_KEY = "supersecretkey"
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRY_TIME = 5_256_000  # 10 years (expiry time in minutes)
 
+# password hashing configuration (argon2 defaults)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+ARGON2_HASH_LEN = int(os.getenv("ARGON2_HASH_LEN", 32))
+ARGON2_SALT_LEN = int(os.getenv("ARGON2_SALT_LEN", 16))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 256))  # 0 means unbounded
+
+# feed configuration
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", 10))
+FEED_SESSION_POOL_SIZE = int(os.getenv("FEED_SESSION_POOL_SIZE", 200))  # candidates ranked at once
+FEED_SESSION_TTL = int(os.getenv("FEED_SESSION_TTL", 1800))  # seconds
+FEED_SESSION_MAX_COUNT = int(os.getenv("FEED_SESSION_MAX_COUNT", 10_000))
+FEED_DEFAULT_RADIUS_KM = float(os.getenv("FEED_DEFAULT_RADIUS_KM", 10.0))
+FEED_MAX_RADIUS_KM = float(os.getenv("FEED_MAX_RADIUS_KM", 100.0))
+FEED_DISTANCE_DECAY_KM = float(os.getenv("FEED_DISTANCE_DECAY_KM", 2.0))  # places this far away keep half their score
+FEED_IMAGES_PER_PLACE = int(os.getenv("FEED_IMAGES_PER_PLACE", 3))  # images of a feed place, unless all are requested
+
+# images, urls are <IMAGE_CDN_URL>/<source id>/<image key> when set, the original urls otherwise
+IMAGE_CDN_URL = os.getenv("IMAGE_CDN_URL", "").rstrip("/")
+
+# offline recommender (python -m src.place.recommender)
+RECOMMENDER_TOP_N = int(os.getenv("RECOMMENDER_TOP_N", 500))  # candidates stored per user
+RECOMMENDER_MIN_REACTIONS = int(os.getenv("RECOMMENDER_MIN_REACTIONS", 10))  # fewer use the TF-IDF feed
+RECOMMENDER_MAX_TYPES = int(os.getenv("RECOMMENDER_MAX_TYPES", 1024))  # most frequent types kept as embedding dimensions
+RECOMMENDER_BATCH_SIZE = int(os.getenv("RECOMMENDER_BATCH_SIZE", 256))  # users scored per matrix product
+
+# cache configuration
+IDF_CACHE_TTL = int(os.getenv("IDF_CACHE_TTL", 600))  # seconds, also how long an import takes to show in the IDF
+TOP_RATED_CACHE_TTL = int(os.getenv("TOP_RATED_CACHE_TTL", 300))  # seconds
+TOP_RATED_CACHE_SIZE = int(os.getenv("TOP_RATED_CACHE_SIZE", 5000))  # places in the cold-start ranking
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10_000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 300))  # seconds
+CACHE_BACKEND_URL = os.getenv("CACHE_BACKEND_URL")  # e.g. redis://localhost:6379/0, in-process (one worker) when unset
+COMMENTS_CACHE_SIZE = int(os.getenv("COMMENTS_CACHE_SIZE", 10_000))  # pages, for the in-process backend
+COMMENTS_CACHE_TTL = int(os.getenv("COMMENTS_CACHE_TTL", 300))  # seconds
+
+# internal endpoints (pool statistics etc.), callers send the token in the X-Internal-Token header
+INTERNAL_API_ENABLED = os.getenv("INTERNAL_API_ENABLED", "false").lower() == "true"
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")  # every request is rejected when unset
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"  # prometheus /metrics, same token
+
+# SQL profiling of single requests, see src/profiling.py
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"  # profile every request
+PROFILING_ALLOW_HEADER = os.getenv("PROFILING_ALLOW_HEADER", "false").lower() == "true"  # X-Debug-Profile: 1
+PROFILING_REPEAT_THRESHOLD = int(os.getenv("PROFILING_REPEAT_THRESHOLD", 3))  # executions of one shape to flag it
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))  # 0 disables the slow query log
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"  # log EXPLAIN ANALYZE of slow selects
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 600))  # seconds between plans of a shape
+
+# server configuration (python -m src.server)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8080))
+# worker processes, more than one needs a shared CACHE_BACKEND_URL for feed sessions and read-your-writes;
+# every worker has its own database pool and hashing pool
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+# seconds an idle connection is kept open, keep it above the idle timeout of the load balancer in front
+SERVER_KEEP_ALIVE_TIMEOUT = int(os.getenv("SERVER_KEEP_ALIVE_TIMEOUT", 75))
+SERVER_GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_SHUTDOWN_TIMEOUT", 30))  # seconds to drain requests
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+SERVER_LIMIT_CONCURRENCY = int(os.getenv("SERVER_LIMIT_CONCURRENCY", 0)) or None  # per worker, 503 above it, 0 disables
+SERVER_FORWARDED_ALLOW_IPS = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")  # proxies trusted for X-Forwarded-*
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+SERVER_WARM_UP = os.getenv("SERVER_WARM_UP", "true").lower() == "true"  # open pool connections and fill caches on startup
+
+# API compatibility
+# render coordinates as strings with 20 decimals, like the former DECIMAL(30, 20) columns, instead of numbers
+LEGACY_COORDINATE_STRINGS = os.getenv("LEGACY_COORDINATE_STRINGS", "true").lower() == "true"
+
 # logging configuration
-LOGGING_LEVEL = logging.DEBUG
+LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "DEBUG")
@@ -1,6 +1,13 @@
+import asyncio
 import contextlib
+import itertools
+import logging
+import time
 from typing import AsyncIterator
 
+import jwt
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     async_sessionmaker,
@@ -10,32 +17,171 @@ from src import config
 
 from typing import Annotated
 
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+
+from src.cache import create_cache_backend
 
 # Heavily inspired by https://praciano.com.br/fastapi-and-async-sqlalchemy-20-with-pytest-done-right.html
 
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session, ORMExecuteState
+
+logger = logging.getLogger(__name__)
+
+# zero while the replica has replayed everything it received, so an idle primary doesn't look like lag
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# "recent_writer:<user id>" for users that committed a write within the read-your-writes window,
+# in the shared cache backend so the read that follows sees it on any worker
+recent_writers = create_cache_backend(
+    config.CACHE_BACKEND_URL, config.USER_CACHE_SIZE, config.DATABASE_READ_YOUR_WRITES_WINDOW
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that also records how long checkouts wait for a connection and how often they time out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def engine_kwargs_from_config() -> dict:
+    server_settings = {"application_name": "vacation-vibes"}
+    if config.DATABASE_STATEMENT_TIMEOUT:
+        server_settings["statement_timeout"] = str(config.DATABASE_STATEMENT_TIMEOUT)
+    if config.DATABASE_IDLE_IN_TRANSACTION_TIMEOUT:
+        server_settings["idle_in_transaction_session_timeout"] = str(config.DATABASE_IDLE_IN_TRANSACTION_TIMEOUT)
+
+    return {
+        "echo": config.DATABASE_ECHO,
+        "poolclass": InstrumentedPool,
+        "pool_size": config.DATABASE_POOL_SIZE,
+        "max_overflow": config.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": config.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": config.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": config.DATABASE_POOL_PRE_PING,
+        "connect_args": {
+            # sqlalchemy's own prepared statement cache, and the one inside asyncpg
+            "prepared_statement_cache_size": config.DATABASE_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": config.DATABASE_STATEMENT_CACHE_SIZE,
+            "command_timeout": config.DATABASE_COMMAND_TIMEOUT,
+            "server_settings": server_settings,
+        },
+    }
+
+
+def get_pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, InstrumentedPool):
+        stats.update(
+            checkouts=pool.checkouts,
+            wait_time_total=pool.wait_time_total,
+            wait_time_avg=pool.wait_time_total / pool.checkouts if pool.checkouts else 0.0,
+            wait_time_max=pool.wait_time_max,
+            timeouts=pool.timeouts,
+        )
+    return stats
+
+
+class Replica:
+    def __init__(self, host: str, engine_kwargs: dict):
+        self.engine = create_async_engine(host, **engine_kwargs)
+        self.sessionmaker = async_sessionmaker(autocommit=False, bind=self.engine, expire_on_commit=False)
+        self.lag = 0.0
+        self.checked_at = float("-inf")
+        self.down_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def name(self) -> str:
+        url = self.engine.url
+        return f"{url.host}:{url.port}" if url.port else url.host
+
+    def mark_down(self, error: Exception) -> None:
+        logger.warning("Replica %s is unavailable, using the primary: %r", self.name, error)
+        self.down_until = time.monotonic() + config.DATABASE_REPLICA_RETRY_AFTER
+
+    async def is_available(self) -> bool:
+        now = time.monotonic()
+        if self.down_until > now:
+            return False
+
+        if now - self.checked_at >= config.DATABASE_REPLICA_LAG_CHECK_INTERVAL and not self._lock.locked():
+            async with self._lock:
+                try:
+                    async with self.engine.connect() as connection:
+                        self.lag = float((await connection.execute(REPLICA_LAG_QUERY)).scalar())
+                except (OSError, asyncio.TimeoutError, exc.DBAPIError, exc.TimeoutError) as e:
+                    self.mark_down(e)
+                    return False
+                finally:
+                    self.checked_at = time.monotonic()
+
+        return self.lag <= config.DATABASE_REPLICA_MAX_LAG
+
+    def stats(self) -> dict:
+        return {
+            "host": self.name,
+            "lag": self.lag,
+            "down": self.down_until > time.monotonic(),
+            "pool": get_pool_stats(self.engine),
+        }
+
+
 class DatabaseSessionManager:
-    def __init__(self, host: str, engine_kwargs=None):
+    def __init__(self, host: str, engine_kwargs=None, replica_hosts=None):
         if engine_kwargs is None:
             engine_kwargs = {}
         self._engine = create_async_engine(host, **engine_kwargs)
         self._sessionmaker = async_sessionmaker(autocommit=False, bind=self._engine, expire_on_commit=False)
+        self._replicas = [Replica(replica_host, engine_kwargs) for replica_host in replica_hosts or []]
+        self._next_replica = itertools.cycle(range(len(self._replicas)))
 
     async def close(self):
         if self._engine is None:
             raise Exception("DatabaseSessionManager is not initialized")
         await self._engine.dispose()
+        for replica in self._replicas:
+            await replica.engine.dispose()
 
         self._engine = None
         self._sessionmaker = None
+        self._replicas = []
 
     @contextlib.asynccontextmanager
     async def connect(self) -> AsyncIterator[AsyncConnection]:
@@ -63,14 +209,145 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
+    async def _replica_session(self) -> AsyncSession | None:
+        """
+        Connected session on the next healthy replica in round-robin order, None when there is none.
+        """
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[next(self._next_replica)]
+            if not await replica.is_available():
+                continue
 
-# todo change echo
-sessionmanager = DatabaseSessionManager(config.DATABASE_URL, {"echo": False})
+            session = replica.sessionmaker()
+            session.info["replica"] = True
+            try:
+                # connect now, so a dead replica falls back to the primary instead of failing the request
+                await session.connection()
+            except (OSError, asyncio.TimeoutError, exc.DBAPIError, exc.TimeoutError) as e:
+                await session.close()
+                replica.mark_down(e)
+                continue
+            return session
 
+        return None
 
-async def get_db_session():
+    @contextlib.asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Session for read-only work, on a replica that is up and not lagging behind, otherwise on the primary.
+        """
+        if self._sessionmaker is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        session = await self._replica_session() or self._sessionmaker()
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def warm_up(self, connections: int) -> None:
+        """
+        Open up to `connections` connections to the primary and every replica at once, so the
+        first requests after a start don't pay for the connection setup.
+        """
+        if self._engine is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        async def ping(engine: AsyncEngine) -> None:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(ping(self._engine) for _ in range(connections)))
+        for replica in self._replicas:
+            results = await asyncio.gather(*(ping(replica.engine) for _ in range(connections)), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                replica.mark_down(errors[0])
+
+    def pool_stats(self) -> dict:
+        if self._engine is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        stats = get_pool_stats(self._engine)
+        if self._replicas:
+            stats["replicas"] = [replica.stats() for replica in self._replicas]
+        return stats
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_write_statement(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _track_commit(session: Session) -> None:
+    # the event is synchronous, get_db_session records the writer once the request is done
+    if session.info.pop("wrote", False):
+        session.info["committed_write"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _track_rollback(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+sessionmanager = DatabaseSessionManager(config.DATABASE_URL, engine_kwargs_from_config(), config.DATABASE_REPLICA_URLS)
+
+
+def request_user_id(request: Request) -> str | None:
+    """
+    Id of the user of a request with a valid bearer token, None for anonymous requests.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, config.SECRET_KEY, algorithms=[config.JWT_ALGORITHM]).get("sub")
+    except jwt.exceptions.PyJWTError:
+        return None
+
+
+async def get_db_session(request: Request):
     async with sessionmanager.session() as session:
+        try:
+            yield session
+        finally:
+            # remembered after a commit, so the user's next reads see their own writes
+            if session.info.pop("committed_write", False):
+                # set by services writing for a user the request has no token of yet, e.g. a registration
+                writer = session.info.get("writer") or request_user_id(request)
+                if writer:
+                    await recent_writers.set(f"recent_writer:{writer}", "1")
+
+
+@contextlib.asynccontextmanager
+async def read_db_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Read session for the request, on the primary when the client has just written something.
+    """
+    writer = request_user_id(request)
+    if writer and await recent_writers.get(f"recent_writer:{writer}"):
+        async with sessionmanager.session() as session:
+            yield session
+    else:
+        async with sessionmanager.read_session() as session:
+            yield session
+
+
+async def get_read_db_session(request: Request):
+    async with read_db_session(request) as session:
         yield session
 
 
 DBSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+# replica session for read-only endpoints, see DatabaseSessionManager.read_session
+ReadDBSessionDep = Annotated[AsyncSession, Depends(get_read_db_session)]
@@ -14,3 +14,8 @@ class InvalidCredentials(HTTPException):
 class TokenExpired(HTTPException):
     def __init__(self, detail: str = "Token expired", status_code: int = 400):
         super().__init__(status_code=status_code, detail=detail)
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self, detail: str = "Invalid pagination cursor", status_code: int = 400):
+        super().__init__(status_code=status_code, detail=detail)
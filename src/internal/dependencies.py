@@ -0,0 +1,13 @@
+import secrets
+
+from fastapi import Header
+
+from src import config
+from src.internal.exceptions import InternalAccessDenied
+
+
+async def verify_internal_token(x_internal_token: str | None = Header(None)) -> None:
+    # without a configured token nobody gets in
+    if not config.INTERNAL_API_TOKEN or x_internal_token is None \
+            or not secrets.compare_digest(x_internal_token.encode(), config.INTERNAL_API_TOKEN.encode()):
+        raise InternalAccessDenied()
@@ -0,0 +1,6 @@
+from fastapi import HTTPException
+
+
+class InternalAccessDenied(HTTPException):
+    def __init__(self, detail: str = "Invalid internal API token", status_code: int = 403):
+        super().__init__(status_code=status_code, detail=detail)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+
+from src.database import sessionmanager
+from src.internal.dependencies import verify_internal_token
+
+# every endpoint needs the X-Internal-Token header
+router = APIRouter(dependencies=[Depends(verify_internal_token)])
+
+
+@router.get("/db/pool")
+async def get_pool_stats() -> dict:
+    return sessionmanager.pool_stats()
@@ -3,23 +3,60 @@
 
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import contextlib
 import logging
 import sys
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from src import config
+from src.auth.hashing import password_pool
 from src.auth.router import router as auth_router
+from src.database import sessionmanager
+from src.internal.router import router as internal_router
+from src.metrics import MetricsMiddleware, metrics
+from src.place.cache import idf_cache, top_rated_cache
 from src.place.router import router as place_router
+from src.profiling import ProfilingMiddleware
 
 logging.basicConfig(stream=sys.stdout, level=config.LOGGING_LEVEL)
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+async def warm_up() -> None:
+    await sessionmanager.warm_up(config.DATABASE_POOL_SIZE)
+    async with sessionmanager.read_session() as db_session:
+        await idf_cache.get(db_session)
+        await top_rated_cache.get(db_session)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.SERVER_WARM_UP:
+        try:
+            await warm_up()
+        except Exception:
+            # the database may come up after the app, the first requests connect then
+            logger.exception("Could not warm up the database pool and caches")
+    yield
+    await sessionmanager.close()
+    password_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(place_router, prefix="/place", tags=["Place"])
+if config.INTERNAL_API_ENABLED:
+    app.include_router(internal_router, prefix="/internal", include_in_schema=False)
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics, include_in_schema=False)
+if config.PROFILING_ENABLED or config.PROFILING_ALLOW_HEADER:
+    app.add_middleware(ProfilingMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
 
-    # todo use uvloop for NOT windows
+    # a single process for development, python -m src.server runs the production setup
     uvicorn.run(app, host="localhost", port=8080)
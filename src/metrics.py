@@ -0,0 +1,182 @@
+"""
+Prometheus metrics: per-route request latency, database queries per route, password hashing
+and connection pool state, served on /metrics to scrapers sending the X-Internal-Token header.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by
+the workers, so every scrape sees the totals of all of them.
+"""
+import contextvars
+import os
+import time
+from dataclasses import dataclass
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.internal.dependencies import verify_internal_token
+
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    multiprocess_mode="livesum"
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duration of single database queries by route template",
+    ["route"], buckets=DB_BUCKETS
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Database queries made by one request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time one request spent waiting for database queries",
+    ["route"], buckets=DB_BUCKETS
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Time spent in argon2 by operation",
+    ["operation"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds", "Time spent waiting for a free hashing worker",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+PASSWORD_HASH_REJECTED = Counter("password_hash_rejected", "Hashing requests rejected with a full queue")
+
+
+@dataclass
+class RequestStats:
+    scope: Scope
+    queries: int = 0
+    query_time: float = 0.0
+
+    @property
+    def route(self) -> str:
+        # set by the router once the request has been matched, keeps the label set bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = stats.route
+            REQUEST_DURATION.labels(scope["method"], route, str(status)).observe(duration)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.query_time)
+            current_request.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    # on the execution context, a statement that fails never reaches after_cursor_execute
+    context.metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - context.metrics_start
+    stats = current_request.get()
+    if stats is None:
+        # scripts and startup work outside of a request
+        DB_QUERY_DURATION.labels("none").observe(duration)
+        return
+
+    stats.queries += 1
+    stats.query_time += duration
+    DB_QUERY_DURATION.labels(stats.route).observe(duration)
+
+
+class PoolCollector:
+    """
+    Reads the connection and hashing pool state at scrape time.
+    """
+
+    def describe(self):
+        # nothing to describe up front, otherwise registering would already collect
+        return []
+
+    def collect(self):
+        # imported here, src.auth.hashing imports this module
+        from src.auth.hashing import password_pool
+        from src.database import sessionmanager
+
+        stats = sessionmanager.pool_stats()
+        pools = [("primary", stats)] + [(replica["host"], replica["pool"]) for replica in stats.get("replicas", [])]
+        for name, help_text, key in (
+                ("db_pool_size", "Connections kept in the pool", "size"),
+                ("db_pool_checked_out", "Connections in use", "checked_out"),
+                ("db_pool_overflow", "Connections opened beyond the pool size", "overflow"),
+                ("db_pool_checkouts", "Connection checkouts", "checkouts"),
+                ("db_pool_wait_seconds", "Total time checkouts waited for a connection", "wait_time_total"),
+                ("db_pool_timeouts", "Checkouts that timed out", "timeouts"),
+        ):
+            metric = GaugeMetricFamily(name, help_text, labels=["database"])
+            for database, pool in pools:
+                if key in pool:
+                    metric.add_metric([database], pool[key])
+            yield metric
+
+        hashing = password_pool.stats()
+        yield GaugeMetricFamily("password_hash_waiting", "Hashing requests waiting for a worker",
+                                value=hashing["waiting"])
+        yield GaugeMetricFamily("password_hash_running", "Hashing requests being computed", value=hashing["running"])
+
+
+REGISTRY.register(PoolCollector())
+
+
+async def metrics(request: Request) -> Response:
+    # pool statistics included, so only for the same callers as the internal API
+    await verify_internal_token(request.headers.get("X-Internal-Token"))
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())  # of the worker serving this scrape
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
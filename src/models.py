@@ -1,8 +1,10 @@
 import uuid
-from sqlalchemy import Column, String, DECIMAL, ForeignKey, CheckConstraint, TIMESTAMP, func, PrimaryKeyConstraint
+from sqlalchemy import Column, String, Integer, DECIMAL, Double, Float, ForeignKey, CheckConstraint, TIMESTAMP, func, PrimaryKeyConstraint, Index, \
+    UniqueConstraint, Computed
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
+from src import config
 from src.database import Base
 
 
@@ -13,6 +15,8 @@ class UserModel(Base):
     name = Column(String)
     email = Column(String, unique=True)
     password = Column(String)  # bcrypt hash
+    like_count = Column(Integer, server_default='0', nullable=False)  # maintained by add_reaction
+    dislike_count = Column(Integer, server_default='0', nullable=False)  # maintained by add_reaction
 
     reactions = relationship('PlaceReactionModel', back_populates='user')
     comments = relationship('PlaceCommentModel', back_populates='user')
@@ -31,37 +35,73 @@ class PlaceTypeModel(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('place_id', 'type'),
+        Index('ix_place_type_type', 'type', 'place_id'),  # IDF and relevance scoring by type
+    )
+
+
+class ImageSourceModel(Base):
+    __tablename__ = 'image_source'
+    id = Column(Integer, primary_key=True)
+    base_url = Column(String, nullable=False)  # e.g. https://commons.wikimedia.org/wiki/Special:FilePath/
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('base_url', name='uq_image_source_base_url'),
     )
 
 
 class PlaceImageModel(Base):
     __tablename__ = 'place_image'
     place_id = Column(UUID(as_uuid=True), ForeignKey('place.id', ondelete='CASCADE'), nullable=False)
-    image_url = Column(String, nullable=False)
+    source_id = Column(Integer, ForeignKey('image_source.id'), nullable=False)
+    image_key = Column(String, nullable=False)  # the url without the base url of the source
+    position = Column(Integer, nullable=False)  # order of the images of a place, the first ones are shown in feeds
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
 
     places = relationship('PlaceModel', back_populates='images')
+    source = relationship('ImageSourceModel', lazy='joined', innerjoin=True)
 
     __table_args__ = (
-        PrimaryKeyConstraint('place_id', 'image_url'),
+        PrimaryKeyConstraint('place_id', 'source_id', 'image_key'),
     )
 
+    @property
+    def image_url(self) -> str:
+        # built when serialized, the same url as src.place.images.image_url_sql
+        if config.IMAGE_CDN_URL:
+            return f"{config.IMAGE_CDN_URL}/{self.source_id}/{self.image_key}"
+        return self.source.base_url + self.image_key
+
 
 class PlaceModel(Base):
     __tablename__ = 'place'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     place_id = Column(String, nullable=False)
-    latitude = Column(DECIMAL(30, 20), nullable=False)
-    longitude = Column(DECIMAL(30, 20), nullable=False)
+    latitude = Column(Double, nullable=False)
+    longitude = Column(Double, nullable=False)
     name = Column(String, nullable=False)
     rating = Column(DECIMAL(3, 2), nullable=True)
+    like_count = Column(Integer, server_default='0', nullable=False)  # maintained by add_reaction
+    dislike_count = Column(Integer, server_default='0', nullable=False)  # maintained by add_reaction
+    user_rating_count = Column(Integer, server_default='0', nullable=False)  # maintained by add_comment
+    user_rating_sum = Column(DECIMAL(12, 2), server_default='0', nullable=False)  # maintained by add_comment
+    user_rating = Column(DECIMAL(3, 2), Computed('round(user_rating_sum / NULLIF(user_rating_count, 0), 2)'))
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
 
     reactions = relationship('PlaceReactionModel', back_populates='place', lazy='noload')
-    images = relationship('PlaceImageModel', back_populates='places', order_by='PlaceImageModel.image_url')
+    images = relationship('PlaceImageModel', back_populates='places',
+                          order_by='PlaceImageModel.position')
     types = relationship('PlaceTypeModel', back_populates='places')
     comments = relationship('PlaceCommentModel', back_populates='place', order_by='PlaceCommentModel.created_at')
 
+    __table_args__ = (
+        UniqueConstraint('place_id', name='uq_place_place_id'),  # dedupe imports
+        Index('ix_place_latitude_longitude', 'latitude', 'longitude'),  # bounding box lookups
+        # top rated feed, the mean user rating stands in for places without an imported rating
+        Index('ix_place_rating', func.coalesce(rating, user_rating).desc().nullslast(),
+              (like_count - dislike_count).self_group().desc()),
+    )
+
     def __repr__(self):
         return f"<PlaceModel(id='{self.id}', place_id='{self.place_id}', latitude='{self.latitude}', longitude='{self.longitude}', created_at='{self.created_at}')>"
 
@@ -80,6 +120,9 @@ class PlaceReactionModel(Base):
 
     __table_args__ = (
         CheckConstraint(reaction.in_(['like', 'dislike']), name='reaction_check'),
+        UniqueConstraint('user_id', 'place_id', name='uq_place_reaction_user_id_place_id'),
+        Index('ix_place_reaction_user_id_created_at', 'user_id', 'created_at', 'id'),  # reactions list
+        Index('ix_place_reaction_place_id', 'place_id'),
     )
 
     def __repr__(self):
@@ -99,5 +142,41 @@ class PlaceCommentModel(Base):
     place = relationship('PlaceModel', back_populates='comments')
     user = relationship('UserModel', back_populates='comments')
 
+    __table_args__ = (
+        Index('ix_place_comment_place_id_created_at', 'place_id', 'created_at', 'id'),  # comments list
+    )
+
     def __repr__(self):
         return f"<PlaceCommentModel(id='{self.id}', place_id='{self.place_id}', comment='{self.comment}', created_at='{self.created_at}')>"
+
+
+class UserTypePreferenceModel(Base):
+    __tablename__ = 'user_type_preference'
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    type = Column(String, nullable=False)
+    score = Column(Float, server_default='0', nullable=False)  # sum of reaction weights for this type
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'type'),
+    )
+
+    def __repr__(self):
+        return f"<UserTypePreferenceModel(user_id='{self.user_id}', type='{self.type}', score='{self.score}')>"
+
+
+class UserFeedCandidateModel(Base):
+    __tablename__ = 'user_feed_candidate'
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    rank = Column(Integer, nullable=False)  # 0 is the best candidate
+    place_id = Column(UUID(as_uuid=True), ForeignKey('place.id', ondelete='CASCADE'), nullable=False)
+    score = Column(Float, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'rank'),
+    )
+
+    def __repr__(self):
+        return f"<UserFeedCandidateModel(user_id='{self.user_id}', rank='{self.rank}', place_id='{self.place_id}', score='{self.score}')>"
@@ -0,0 +1,26 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from src.exceptions import InvalidCursor
+
+# header carrying the cursor of the next page of list endpoints
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id_: uuid.UUID) -> str:
+    """
+    Opaque keyset cursor pointing right after the (created_at, id) of the last item of a page.
+    """
+    payload = json.dumps([created_at.isoformat(), str(id_)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id_ = json.loads(payload)
+        return datetime.fromisoformat(created_at), uuid.UUID(id_)
+    except (ValueError, TypeError):
+        raise InvalidCursor()
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import math
+import secrets
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import config
+from src.cache import CacheBackend, create_cache_backend
+from src.models import PlaceModel, PlaceTypeModel
+from src.place.constants import COMMON_TYPES, TOP_RATED_ORDER
+
+
+class IdfCache:
+    """
+    In-process cache of the inverse document frequency of every place type (common types excluded).
+
+    Places are only written by the importer, which runs in its own process, so the table is
+    rebuilt once it gets older than the TTL. After an import the weights can be stale for up
+    to IDF_CACHE_TTL seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._loaded_at = float("-inf")
+        self._idf: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() - self._loaded_at < self._ttl
+
+    async def get(self, db_session: AsyncSession) -> dict[str, float]:
+        if not self._is_fresh():
+            async with self._lock:
+                # another request may have refreshed the table while we were waiting for the lock
+                if not self._is_fresh():
+                    await self.refresh(db_session)
+        return self._idf
+
+    async def refresh(self, db_session: AsyncSession) -> None:
+        # Get the total number of places for IDF calculation
+        total_places_query = select(func.count()).select_from(PlaceModel)
+        total_places = (await db_session.execute(total_places_query)).scalar()
+
+        # Get count of places for each type (excluding common types)
+        type_counts_query = (
+            select(
+                PlaceTypeModel.type,
+                func.count().label('type_count')
+            )
+            .group_by(PlaceTypeModel.type)
+            .filter(~PlaceTypeModel.type.in_(COMMON_TYPES))
+        )
+        type_counts = (await db_session.execute(type_counts_query)).all()
+
+        # IDF (inverse document frequency) - how rare/specific the type is
+        self._idf = {
+            type_name: math.log(total_places / type_count)
+            for type_name, type_count in type_counts
+            if type_count > 0
+        }
+        self._loaded_at = time.monotonic()
+
+
+idf_cache = IdfCache(config.IDF_CACHE_TTL)
+
+
+class TopRatedCache:
+    """
+    In-process ranking of the best places for users without personal preferences.
+
+    Reloaded when older than the TTL, reading only the first `size` entries of ix_place_rating.
+    """
+
+    def __init__(self, ttl: float, size: int):
+        self._ttl = ttl
+        self.size = size
+        self._loaded_at = float("-inf")
+        self._ranking: list[uuid.UUID] = []
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() - self._loaded_at < self._ttl
+
+    async def get(self, db_session: AsyncSession) -> list[uuid.UUID]:
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self.refresh(db_session)
+        return self._ranking
+
+    async def refresh(self, db_session: AsyncSession) -> None:
+        query = select(PlaceModel.id).order_by(*TOP_RATED_ORDER).limit(self.size)
+        # replaced as a whole, requests walking the old list keep a consistent view
+        self._ranking = list((await db_session.execute(query)).scalars().all())
+        self._loaded_at = time.monotonic()
+
+
+top_rated_cache = TopRatedCache(config.TOP_RATED_CACHE_TTL, config.TOP_RATED_CACHE_SIZE)
+
+
+@dataclass
+class FeedSession:
+    """
+    Ranked feed candidates of a single user, served page by page under a cursor token.
+    """
+    user_id: uuid.UUID
+    candidates: list[uuid.UUID] = field(default_factory=list)  # ranked, not yet served
+    served: set[uuid.UUID] = field(default_factory=set)
+
+
+class FeedSessionStore:
+    """
+    Feed sessions by cursor token, in the cache backend, so any worker can serve the next page.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self._backend = backend
+
+    async def get(self, cursor: str) -> FeedSession | None:
+        value = await self._backend.get(f"feed_session:{cursor}")
+        if value is None:
+            return None
+        data = json.loads(value)
+        return FeedSession(
+            user_id=uuid.UUID(data["user_id"]),
+            candidates=[uuid.UUID(place_id) for place_id in data["candidates"]],
+            served={uuid.UUID(place_id) for place_id in data["served"]},
+        )
+
+    async def set(self, cursor: str, feed_session: FeedSession) -> None:
+        await self._backend.set(f"feed_session:{cursor}", json.dumps({
+            "user_id": str(feed_session.user_id),
+            "candidates": [str(place_id) for place_id in feed_session.candidates],
+            "served": [str(place_id) for place_id in feed_session.served],
+        }))
+
+    async def delete(self, cursor: str) -> None:
+        await self._backend.delete(f"feed_session:{cursor}")
+
+
+feed_sessions = FeedSessionStore(
+    create_cache_backend(config.CACHE_BACKEND_URL, config.FEED_SESSION_MAX_COUNT, config.FEED_SESSION_TTL)
+)
+
+
+@dataclass
+class CommentsPage:
+    body: str  # serialized list[PlaceComment]
+    etag: str
+    next_cursor: str | None = None
+
+
+class CommentsCache:
+    """
+    Serialized comment pages keyed by place, page size and cursor.
+
+    Page keys include a per-place version token, so `invalidate` drops every page of a place
+    at once by replacing the token, whatever the backend is.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self._backend = backend
+
+    @staticmethod
+    def version_age(version: str) -> float:
+        # versions start with their creation time
+        return time.time() - float(version.split("-", 1)[0])
+
+    async def invalidate(self, place_id: uuid.UUID) -> str:
+        version = f"{time.time():.6f}-{secrets.token_hex(4)}"
+        await self._backend.set(f"comments:{place_id}:version", version)
+        return version
+
+    async def get(self, place_id: uuid.UUID, limit: int, cursor: str | None) -> tuple[CommentsPage | None, str]:
+        """
+        Return the cached page (if any) and the current version of the place to store a fresh page under.
+        """
+        version = await self._backend.get(f"comments:{place_id}:version")
+        if version is None:
+            # never fall back to a default version, pages cached under it may be stale
+            return None, await self.invalidate(place_id)
+
+        value = await self._backend.get(f"comments:{place_id}:{version}:{limit}:{cursor or ''}")
+        return (CommentsPage(**json.loads(value)) if value is not None else None), version
+
+    async def set(self, place_id: uuid.UUID, version: str, limit: int, cursor: str | None,
+                  page: CommentsPage) -> None:
+        await self._backend.set(
+            f"comments:{place_id}:{version}:{limit}:{cursor or ''}",
+            json.dumps({"body": page.body, "etag": page.etag, "next_cursor": page.next_cursor})
+        )
+
+
+comments_cache = CommentsCache(
+    create_cache_backend(config.CACHE_BACKEND_URL, config.COMMENTS_CACHE_SIZE, config.COMMENTS_CACHE_TTL)
+)
@@ -0,0 +1,19 @@
+from sqlalchemy import func
+
+from src.models import PlaceModel
+
+# Ignore overly common types that don't provide meaningful differentiation
+COMMON_TYPES = {"establishment", "point_of_interest", "tourist_attraction"}
+
+# How much a single reaction moves the user's preference score for each type of the place
+REACTION_WEIGHTS = {"like": 1.0, "dislike": -0.5}
+
+# New users with fewer reactions don't have meaningful preferences yet
+COLD_START_REACTIONS = 50
+
+# Ordering of places when there is nothing personal to rank them by
+TOP_RATED_ORDER = (
+    # the mean user rating stands in for places without an imported rating, same as ix_place_rating
+    func.coalesce(PlaceModel.rating, PlaceModel.user_rating).desc().nullslast(),
+    (PlaceModel.like_count - PlaceModel.dislike_count).desc()
+)
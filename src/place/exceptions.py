@@ -4,3 +4,8 @@ from fastapi import HTTPException
 class InvalidPlaceException(HTTPException):
     def __init__(self, detail: str = "This place does not exist", status_code: int = 400):
         super().__init__(status_code=status_code, detail=detail)
+
+
+class ReactionAlreadyExists(HTTPException):
+    def __init__(self, detail: str = "You have already reacted to this place", status_code: int = 400):
+        super().__init__(status_code=status_code, detail=detail)
@@ -0,0 +1,84 @@
+import math
+from dataclasses import dataclass
+
+from sqlalchemy import ColumnElement, and_, or_, func
+
+from src import config
+from src.models import PlaceModel
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+@dataclass
+class GeoArea:
+    latitude: float
+    longitude: float
+    radius_km: float
+
+
+def haversine_km(latitude_1: float, longitude_1: float, latitude_2: float, longitude_2: float) -> float:
+    latitude_1, longitude_1, latitude_2, longitude_2 = map(
+        math.radians, (latitude_1, longitude_1, latitude_2, longitude_2)
+    )
+    a = (
+        math.sin((latitude_2 - latitude_1) / 2) ** 2
+        + math.cos(latitude_1) * math.cos(latitude_2) * math.sin((longitude_2 - longitude_1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box_filter(area: GeoArea) -> ColumnElement[bool]:
+    """
+    Cheap pre-filter that can use the (latitude, longitude) index: the smallest
+    latitude/longitude box that contains the whole circle of the area.
+    """
+    angular_radius = area.radius_km / EARTH_RADIUS_KM
+    delta_latitude = math.degrees(angular_radius)
+    min_latitude = area.latitude - delta_latitude
+    max_latitude = area.latitude + delta_latitude
+    latitude_filter = PlaceModel.latitude.between(max(min_latitude, -90.0), min(max_latitude, 90.0))
+
+    sin_delta_longitude = math.sin(angular_radius) / math.cos(math.radians(area.latitude))
+    if min_latitude <= -90 or max_latitude >= 90 or sin_delta_longitude >= 1:
+        # the circle contains a pole, every longitude is in range
+        return latitude_filter
+
+    delta_longitude = math.degrees(math.asin(sin_delta_longitude))
+    min_longitude = area.longitude - delta_longitude
+    max_longitude = area.longitude + delta_longitude
+    if min_longitude < -180:
+        # the box crosses the antimeridian, split it in two
+        longitude_filter = or_(PlaceModel.longitude >= min_longitude + 360, PlaceModel.longitude <= max_longitude)
+    elif max_longitude > 180:
+        longitude_filter = or_(PlaceModel.longitude >= min_longitude, PlaceModel.longitude <= max_longitude - 360)
+    else:
+        longitude_filter = PlaceModel.longitude.between(min_longitude, max_longitude)
+
+    return and_(latitude_filter, longitude_filter)
+
+
+def distance_km(area: GeoArea) -> ColumnElement[float]:
+    """
+    Haversine distance between the place and the center of the area.
+    """
+    latitude = func.radians(PlaceModel.latitude)
+    longitude = func.radians(PlaceModel.longitude)
+    center_latitude = math.radians(area.latitude)
+    center_longitude = math.radians(area.longitude)
+
+    a = (
+        func.power(func.sin((latitude - center_latitude) / 2), 2)
+        + func.cos(latitude) * math.cos(center_latitude) * func.power(func.sin((longitude - center_longitude) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def within_area(area: GeoArea) -> ColumnElement[bool]:
+    return and_(bounding_box_filter(area), distance_km(area) <= area.radius_km)
+
+
+def decay_by_distance(score: ColumnElement[float], area: GeoArea) -> ColumnElement[float]:
+    """
+    Combine a relevance score with proximity, a place FEED_DISTANCE_DECAY_KM away keeps half of its score.
+    """
+    return score / (1 + distance_km(area) / config.FEED_DISTANCE_DECAY_KM)
@@ -0,0 +1,59 @@
+"""
+Images are stored as a source (the common URL prefix, stored once in image_source) and a key
+(the rest of the URL). Full URLs are only built when a place is serialized, see image_url_sql and
+PlaceImageModel.image_url, so the images can be moved behind a CDN with IMAGE_CDN_URL.
+"""
+import re
+
+from sqlalchemy import ColumnElement, literal, select, cast, Text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import config
+from src.models import ImageSourceModel, PlaceImageModel
+
+WIKIMEDIA_FILE_URL = "https://commons.wikimedia.org/wiki/Special:FilePath/"
+
+# prefixes longer than the origin that are worth a source of their own
+KNOWN_BASE_URLS = (WIKIMEDIA_FILE_URL,)
+
+# the origin with its trailing slash, the same pattern the migration of the existing urls used
+_ORIGIN = re.compile(r"[a-z][a-z0-9+.-]*://[^/]+/")
+
+
+def split_image_url(url: str) -> tuple[str, str]:
+    """
+    Return the base url (the source) and the key of an image url, base url + key is the url.
+    """
+    for base_url in KNOWN_BASE_URLS:
+        if url.startswith(base_url):
+            return base_url, url[len(base_url):]
+    match = _ORIGIN.match(url)
+    base_url = match.group() if match else ""  # the catch-all source, the key is the whole url
+    return base_url, url[len(base_url):]
+
+
+async def get_image_source_ids(db_session: AsyncSession, base_urls: set[str]) -> dict[str, int]:
+    """
+    Return the source id of every base url, creating the sources that don't exist yet.
+    """
+    if not base_urls:
+        return {}
+
+    await db_session.execute(
+        insert(ImageSourceModel).values([{"base_url": base_url} for base_url in base_urls]).on_conflict_do_nothing()
+    )
+    rows = await db_session.execute(
+        select(ImageSourceModel.base_url, ImageSourceModel.id).filter(ImageSourceModel.base_url.in_(base_urls))
+    )
+    return dict(rows.all())
+
+
+def image_url_sql() -> ColumnElement[str]:
+    """
+    PlaceImageModel.image_url in SQL, for queries joined with image_source.
+    """
+    if config.IMAGE_CDN_URL:
+        return literal(f"{config.IMAGE_CDN_URL}/") + cast(PlaceImageModel.source_id, Text) + "/" \
+            + PlaceImageModel.image_key
+    return ImageSourceModel.base_url + PlaceImageModel.image_key
@@ -0,0 +1,271 @@
+"""
+Import places from an OpenStreetMap Overpass dump (JSON or XML) into place, place_type, place_image
+and image_source.
+
+The dump is streamed and loaded in chunks of multi-row upserts, so re-running an import is
+idempotent, and an interrupted import continues from the last committed chunk:
+
+    python -m src.place.importer export.json
+    python -m src.place.importer export.osm --chunk-size 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+from decimal import Decimal
+from itertools import islice
+from typing import IO, Iterator
+
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database import sessionmanager
+from src.models import PlaceModel, PlaceTypeModel, PlaceImageModel
+from src.place.images import WIKIMEDIA_FILE_URL, split_image_url, get_image_source_ids
+
+# OSM tags whose values become place types, e.g. amenity=restaurant -> "restaurant"
+TYPE_TAGS = ("amenity", "tourism", "leisure", "historic", "natural", "shop")
+
+# Overpass types used by the rest of the catalog
+TYPE_ALIASES = {"attraction": "tourist_attraction"}
+
+READ_SIZE = 1 << 16
+
+# postgres accepts at most 32767 bind parameters per statement
+MAX_PARAMETERS = 32767
+
+
+def iter_json_elements(file: IO[str]) -> Iterator[dict]:
+    """
+    Yield the objects of the top level "elements" array without loading the whole file.
+    """
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buffer = ""
+    position = 0
+    in_elements = False
+
+    while True:
+        if not in_elements:
+            start = buffer.find('"elements"')
+            bracket = buffer.find("[", start) if start != -1 else -1
+            if bracket != -1:
+                in_elements = True
+                position = bracket + 1
+                # the elements may already be in the buffer, e.g. a dump smaller than READ_SIZE
+                continue
+        else:
+            # skip separators between the elements
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer):
+                if buffer[position] == "]":
+                    return
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    pass  # the element continues in the next chunk
+                else:
+                    yield element
+                    position = end
+                    continue
+
+        chunk = file.read(READ_SIZE)
+        if not chunk:
+            if in_elements and buffer[position:].strip():
+                raise ValueError("Unexpected end of the Overpass JSON dump")
+            return
+        buffer = buffer[position:] + chunk if in_elements else buffer + chunk
+        if in_elements:
+            position = 0
+
+
+def iter_xml_elements(file: IO[bytes]) -> Iterator[dict]:
+    """
+    Yield nodes, ways and relations of an OSM XML dump in the shape of Overpass JSON elements.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(file, events=("start", "end")):
+        if root is None:
+            root = element
+        if event != "end" or element.tag not in ("node", "way", "relation"):
+            continue
+
+        result = {
+            "type": element.tag,
+            "id": int(element.get("id")),
+            "tags": {tag.get("k"): tag.get("v") for tag in element.iter("tag")},
+        }
+        if element.get("lat") is not None:
+            result["lat"] = Decimal(element.get("lat"))
+            result["lon"] = Decimal(element.get("lon"))
+        center = element.find("center")
+        if center is not None:
+            result["center"] = {"lat": Decimal(center.get("lat")), "lon": Decimal(center.get("lon"))}
+
+        yield result
+        root.clear()  # drop the parsed elements to keep memory flat on large dumps
+
+
+def element_to_place(element: dict) -> dict | None:
+    tags = element.get("tags") or {}
+    name = tags.get("name")
+    # ways and relations only have coordinates when exported with "out center"
+    coordinates = element if "lat" in element else element.get("center")
+    if not name or not coordinates:
+        return None
+
+    types = []
+    for tag in TYPE_TAGS:
+        for value in tags.get(tag, "").split(";"):
+            value = value.strip().lower()
+            if value:
+                # e.g. historic=yes -> "historic"
+                type_name = tag if value == "yes" else TYPE_ALIASES.get(value, value)
+                if type_name not in types:
+                    types.append(type_name)
+
+    images = []
+    if tags.get("image", "").startswith(("http://", "https://")):
+        images.append(tags["image"])
+    if tags.get("wikimedia_commons", "").startswith("File:"):
+        file_name = tags["wikimedia_commons"].removeprefix("File:").replace(" ", "_")
+        images.append(f"{WIKIMEDIA_FILE_URL}{file_name}")
+
+    return {
+        "place_id": f"osm:{element['type']}/{element['id']}",
+        "name": name,
+        "latitude": float(coordinates["lat"]),
+        "longitude": float(coordinates["lon"]),
+        "types": types,
+        "images": images,
+    }
+
+
+def batched(rows: list[dict], columns: int) -> Iterator[list[dict]]:
+    size = MAX_PARAMETERS // columns
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def load_chunk(places: list[dict]) -> None:
+    # the same place can appear twice in a dump, the last occurrence wins
+    places = list({place["place_id"]: place for place in places}.values())
+
+    async with sessionmanager.session() as db_session:
+        place_rows = [
+            {
+                "place_id": place["place_id"],
+                "name": place["name"],
+                "latitude": place["latitude"],
+                "longitude": place["longitude"],
+            }
+            for place in places
+        ]
+        ids = {}
+        # the id column is filled in by a python default, so it takes a parameter too
+        for rows in batched(place_rows, 5):
+            place_query = insert(PlaceModel).values(rows)
+            place_query = place_query.on_conflict_do_update(
+                constraint="uq_place_place_id",
+                set_={
+                    "name": place_query.excluded.name,
+                    "latitude": place_query.excluded.latitude,
+                    "longitude": place_query.excluded.longitude,
+                }
+            ).returning(PlaceModel.place_id, PlaceModel.id)
+            ids.update((await db_session.execute(place_query)).all())
+
+        type_rows = [
+            {"place_id": ids[place["place_id"]], "type": type_name}
+            for place in places
+            for type_name in place["types"]
+        ]
+        for rows in batched(type_rows, 2):
+            await db_session.execute(insert(PlaceTypeModel).values(rows).on_conflict_do_nothing())
+
+        # images keep the order of the dump, the tagged image first
+        images = [
+            (ids[place["place_id"]], position, *split_image_url(image_url))
+            for place in places
+            for position, image_url in enumerate(place["images"])
+        ]
+        source_ids = await get_image_source_ids(db_session, {base_url for _, _, base_url, _ in images})
+        image_rows = [
+            {"place_id": place_id, "source_id": source_ids[base_url], "image_key": image_key, "position": position}
+            for place_id, position, base_url, image_key in images
+        ]
+        for rows in batched(image_rows, 4):
+            image_query = insert(PlaceImageModel).values(rows)
+            image_query = image_query.on_conflict_do_update(
+                index_elements=["place_id", "source_id", "image_key"],
+                set_={"position": image_query.excluded.position}
+            )
+            await db_session.execute(image_query)
+
+        await db_session.commit()
+
+
+def read_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as file:
+        return json.load(file)["processed"]
+
+
+def write_checkpoint(path: str, processed: int) -> None:
+    # write then rename, so a crash never leaves a half-written checkpoint
+    with open(path + ".tmp", "w") as file:
+        json.dump({"processed": processed}, file)
+    os.replace(path + ".tmp", path)
+
+
+async def import_dump(path: str, dump_format: str, chunk_size: int, restart: bool) -> None:
+    checkpoint_path = path + ".checkpoint"
+    processed = 0 if restart else read_checkpoint(checkpoint_path)
+    if processed:
+        print(f"Resuming after {processed} elements")
+
+    if dump_format == "json":
+        file = open(path, encoding="utf-8")
+        elements = iter_json_elements(file)
+    else:
+        file = open(path, "rb")
+        elements = iter_xml_elements(file)
+
+    imported = 0
+    try:
+        # elements before the checkpoint are already committed
+        elements = islice(elements, processed, None)
+        while True:
+            chunk = list(islice(elements, chunk_size))
+            if not chunk:
+                break
+
+            places = [place for place in map(element_to_place, chunk) if place is not None]
+            if places:
+                await load_chunk(places)
+
+            processed += len(chunk)
+            imported += len(places)
+            write_checkpoint(checkpoint_path, processed)
+            print(f"Processed {processed} elements, imported {imported} places")
+    finally:
+        file.close()
+        await sessionmanager.close()
+
+    # the import is complete, the next run starts from scratch
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Overpass JSON or OSM XML dump")
+    parser.add_argument("--format", choices=["json", "xml"], dest="dump_format",
+                        help="dump format, guessed from the file extension by default")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="places per transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    dump_format = args.dump_format or ("json" if args.path.endswith(".json") else "xml")
+    asyncio.run(import_dump(args.path, dump_format, args.chunk_size, args.restart))
@@ -0,0 +1,192 @@
+"""
+Precompute feed candidates for every user with enough reactions, for get_user_feed to read.
+
+Places are embedded by their (IDF weighted, unit length) types, users by the reaction weighted
+sum of the places they reacted to, and every place is scored by cosine similarity to the user
+in batched sparse matrix products. Meant to run periodically, e.g. from cron:
+
+    python -m src.place.recommender
+    python -m src.place.recommender --top-n 1000 --batch-size 128
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import config
+from src.database import sessionmanager
+from src.models import PlaceTypeModel, PlaceReactionModel, UserFeedCandidateModel
+from src.place.cache import idf_cache
+from src.place.constants import COMMON_TYPES, REACTION_WEIGHTS
+from src.place.importer import batched
+
+
+class PlaceEmbeddings:
+    """
+    Sparse places x types matrix with unit length rows, and the place ids of its rows.
+    """
+
+    def __init__(self, place_ids: list[uuid.UUID], matrix: sparse.csr_matrix):
+        self.place_ids = place_ids
+        self.index = {place_id: i for i, place_id in enumerate(place_ids)}
+        self.matrix = matrix
+
+
+def normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.csr_matrix(sparse.diags(scale) @ matrix)
+
+
+async def load_place_embeddings(db_session: AsyncSession, max_types: int) -> PlaceEmbeddings:
+    type_idf = await idf_cache.get(db_session)  # common types are excluded already
+
+    rows = (await db_session.execute(
+        select(PlaceTypeModel.place_id, PlaceTypeModel.type).filter(~PlaceTypeModel.type.in_(COMMON_TYPES))
+    )).all()
+    rows = [row for row in rows if row[1] in type_idf]
+
+    place_ids = list(dict.fromkeys(place_id for place_id, _ in rows))
+    place_index = {place_id: i for i, place_id in enumerate(place_ids)}
+    type_names = list(type_idf)
+    type_index = {type_name: i for i, type_name in enumerate(type_names)}
+
+    place_idx = np.fromiter((place_index[place_id] for place_id, _ in rows), dtype=np.int64, count=len(rows))
+    type_idx = np.fromiter((type_index[type_name] for _, type_name in rows), dtype=np.int64, count=len(rows))
+
+    # keep the most frequent types, they cover most places with the fewest dimensions
+    type_counts = np.bincount(type_idx, minlength=len(type_names))
+    kept = np.argsort(-type_counts, kind="stable")[:max_types]
+    column = np.full(len(type_names), -1)
+    column[kept] = np.arange(len(kept))
+    idf = np.array([type_idf[type_names[i]] for i in kept], dtype=np.float32)
+
+    # a place has a handful of types out of up to max_types, only those are stored
+    mask = column[type_idx] >= 0
+    columns = column[type_idx[mask]]
+    matrix = sparse.csr_matrix(
+        (idf[columns], (place_idx[mask], columns)), shape=(len(place_ids), len(kept)), dtype=np.float32
+    )
+    return PlaceEmbeddings(place_ids, normalize_rows(matrix))
+
+
+async def load_reactions(db_session: AsyncSession, embeddings: PlaceEmbeddings,
+                         min_reactions: int) -> tuple[list[uuid.UUID], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the users with enough reactions and the (user, place, weight) arrays of their reactions
+    to embedded places, sorted by user.
+    """
+    rows = (await db_session.execute(
+        select(PlaceReactionModel.user_id, PlaceReactionModel.place_id, PlaceReactionModel.reaction)
+    )).all()
+
+    user_ids = list(dict.fromkeys(user_id for user_id, _, _ in rows))
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    user_idx = np.fromiter((user_index[user_id] for user_id, _, _ in rows), dtype=np.int64, count=len(rows))
+    # reactions to places without any embedded type don't say anything about the user's taste
+    place_idx = np.fromiter((embeddings.index.get(place_id, -1) for _, place_id, _ in rows),
+                            dtype=np.int64, count=len(rows))
+    weights = np.fromiter((REACTION_WEIGHTS.get(reaction, 0.0) for _, _, reaction in rows),
+                          dtype=np.float32, count=len(rows))
+
+    # the threshold counts every reaction, like the TF-IDF feed does
+    qualified = np.bincount(user_idx, minlength=len(user_ids)) >= min_reactions
+    mask = qualified[user_idx] & (place_idx >= 0)
+
+    # renumber the qualified users, so their reactions are contiguous and sorted
+    new_index = np.cumsum(qualified) - 1
+    user_idx = new_index[user_idx[mask]]
+    order = np.argsort(user_idx, kind="stable")
+    users = [user_id for user_id, keep in zip(user_ids, qualified) if keep]
+    return users, user_idx[order], place_idx[mask][order], weights[mask][order]
+
+
+def top_candidates(embeddings: PlaceEmbeddings, user_idx: np.ndarray, place_idx: np.ndarray, weights: np.ndarray,
+                   users: int, top_n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score every place for a batch of users (local indices 0..users-1) and return the top_n place indices
+    and scores per user, best first. Places the users reacted to score -inf.
+    """
+    # users x places reaction weights times the embeddings, the weighted sum of every user's places
+    reactions = sparse.csr_matrix(
+        (weights, (user_idx, place_idx)), shape=(users, embeddings.matrix.shape[0]), dtype=np.float32
+    )
+    profiles = normalize_rows(reactions @ embeddings.matrix)
+
+    # only the scores of a batch are dense, they are ranked right away
+    scores = (profiles @ embeddings.matrix.T).toarray()
+    scores[user_idx, place_idx] = -np.inf
+
+    top_n = min(top_n, scores.shape[1])
+    top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+async def store_candidates(db_session: AsyncSession, user_ids: list[uuid.UUID], embeddings: PlaceEmbeddings,
+                           top: np.ndarray, top_scores: np.ndarray) -> int:
+    rows = [
+        {"user_id": user_id, "rank": rank, "place_id": embeddings.place_ids[place], "score": float(score)}
+        for user_id, places, scores in zip(user_ids, top, top_scores)
+        for rank, (place, score) in enumerate(
+            (place, score) for place, score in zip(places, scores) if score > 0
+        )
+    ]
+
+    await db_session.execute(delete(UserFeedCandidateModel).where(UserFeedCandidateModel.user_id.in_(user_ids)))
+    for chunk in batched(rows, 4):
+        await db_session.execute(insert(UserFeedCandidateModel).values(chunk))
+    await db_session.commit()
+    return len(rows)
+
+
+async def recommend(top_n: int, batch_size: int, min_reactions: int, max_types: int) -> None:
+    start = time.perf_counter()
+    try:
+        async with sessionmanager.session() as db_session:
+            embeddings = await load_place_embeddings(db_session, max_types)
+            users, user_idx, place_idx, weights = await load_reactions(db_session, embeddings, min_reactions)
+        print(f"Loaded {len(embeddings.place_ids)} places x {embeddings.matrix.shape[1]} types "
+              f"and {len(user_idx)} reactions of {len(users)} users in {time.perf_counter() - start:.1f}s")
+
+        if not users or not embeddings.place_ids:
+            return
+
+        # reactions are sorted by user, so every batch is a contiguous slice
+        boundaries = np.searchsorted(user_idx, np.arange(0, len(users) + batch_size, batch_size))
+        stored = 0
+        for batch, first_user in enumerate(range(0, len(users), batch_size)):
+            batch_users = users[first_user:first_user + batch_size]
+            reactions = slice(boundaries[batch], boundaries[batch + 1])
+            top, top_scores = top_candidates(
+                embeddings, user_idx[reactions] - first_user, place_idx[reactions], weights[reactions],
+                len(batch_users), top_n
+            )
+            async with sessionmanager.session() as db_session:
+                stored += await store_candidates(db_session, batch_users, embeddings, top, top_scores)
+            print(f"Scored {first_user + len(batch_users)}/{len(users)} users")
+
+        print(f"Stored {stored} candidates in {time.perf_counter() - start:.1f}s")
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-n", type=int, default=config.RECOMMENDER_TOP_N, help="candidates stored per user")
+    parser.add_argument("--batch-size", type=int, default=config.RECOMMENDER_BATCH_SIZE,
+                        help="users scored per matrix product")
+    parser.add_argument("--min-reactions", type=int, default=config.RECOMMENDER_MIN_REACTIONS,
+                        help="users with fewer reactions keep the TF-IDF feed")
+    parser.add_argument("--max-types", type=int, default=config.RECOMMENDER_MAX_TYPES,
+                        help="most frequent types kept as embedding dimensions")
+    args = parser.parse_args()
+
+    asyncio.run(recommend(args.top_n, args.batch_size, args.min_reactions, args.max_types))
@@ -1,17 +1,23 @@
 import uuid
 
 import sqlalchemy
-from fastapi import APIRouter, Query, HTTPException
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT
+from fastapi import APIRouter, Query, Header, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT, HTTP_304_NOT_MODIFIED
 
-from src.auth.dependencies import CurrentUserDep
+from src import config
+from src.auth.dependencies import CurrentUserIdDep
 from src.place import service
-from src.database import DBSessionDep
+from src.place.geo import GeoArea
+from src.database import DBSessionDep, ReadDBSessionDep, read_db_session
+from src.pagination import NEXT_CURSOR_HEADER
 
-from src.place.schemas import ReactionData, SuccessResponse, ReactionsList, PlaceMin, PlaceCommentSchema
+from src.place.schemas import ReactionData, BatchReactionData, BatchReactionResponse, FeedPage, SuccessResponse, \
+    ReactionsList, PlaceMin, PlaceCommentSchema
 from src.schemas import PlaceScheme, PlaceComment
 
-router = APIRouter()
+# the feed and place lists are the largest payloads
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.post(
@@ -19,26 +25,41 @@ router = APIRouter()
     response_model=SuccessResponse
 )
 async def reaction(
-        user: CurrentUserDep,
+        user_id: CurrentUserIdDep,
         reaction_data: ReactionData,
         db_session: DBSessionDep
 ) -> SuccessResponse:
-    await service.add_reaction(db_session, reaction_data, user)
+    await service.add_reaction(db_session, reaction_data, user_id)
     return SuccessResponse(success=True, message="Reaction successfully added!")
 
 
+@router.post(
+    "/reactions/batch",
+    response_model=BatchReactionResponse
+)
+async def reactions_batch(
+        user_id: CurrentUserIdDep,
+        batch_data: BatchReactionData,
+        db_session: DBSessionDep
+) -> BatchReactionResponse:
+    return await service.add_reactions(db_session, batch_data.reactions, user_id)
+
+
 @router.get(
     "/reactions",
     response_model=list[PlaceMin]
 )
 async def reaction(
-        user: CurrentUserDep,
-        db_session: DBSessionDep,
+        user_id: CurrentUserIdDep,
+        db_session: ReadDBSessionDep,
         offset: int = Query(0, ge=0),
-        limit: int = Query(10, le=100)
-) -> list[PlaceScheme]:
-    reactions = await service.get_user_reactions(db_session, user, offset, limit)
-    return reactions
+        limit: int = Query(10, ge=1, le=100),
+        cursor: str | None = Query(None, max_length=256),
+) -> Response:
+    # the JSON is built by postgres already, return it as is instead of validating it again
+    reactions_json, next_cursor = await service.get_user_reactions(db_session, user_id, offset, limit, cursor)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(content=reactions_json, media_type="application/json", headers=headers)
 
 
 @router.get(
@@ -46,24 +67,86 @@ async def reaction(
     response_model=list[PlaceMin]
 )
 async def feed(
-        user: CurrentUserDep,
-        db_session: DBSessionDep,
+        user_id: CurrentUserIdDep,
+        db_session: ReadDBSessionDep,
         ignore_ids: list[uuid.UUID] = Query([]),
+        latitude: float | None = Query(None, ge=-90, le=90),
+        longitude: float | None = Query(None, ge=-180, le=180),
+        radius_km: float = Query(config.FEED_DEFAULT_RADIUS_KM, gt=0, le=config.FEED_MAX_RADIUS_KM),
+        all_images: bool = Query(False),
 ) -> list[PlaceScheme]:
-    feed = await service.get_user_feed(db_session, user, ignore_ids)
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail="Both latitude and longitude are required for a location-aware feed"
+        )
+
+    area = GeoArea(latitude, longitude, radius_km) if latitude is not None else None
+    images_limit = None if all_images else config.FEED_IMAGES_PER_PLACE
+    feed = await service.get_user_feed(db_session, user_id, ignore_ids, area=area, images_limit=images_limit)
     return feed
 
 
+@router.get(
+    "/nearby",
+    response_model=list[PlaceMin]
+)
+async def nearby(
+        user_id: CurrentUserIdDep,
+        db_session: ReadDBSessionDep,
+        latitude: float = Query(ge=-90, le=90),
+        longitude: float = Query(ge=-180, le=180),
+        radius_km: float = Query(config.FEED_DEFAULT_RADIUS_KM, gt=0, le=config.FEED_MAX_RADIUS_KM),
+        limit: int = Query(10, ge=1, le=50)
+) -> list[PlaceScheme]:
+    area = GeoArea(latitude, longitude, radius_km)
+    return await service.get_nearby_places(db_session, user_id, area, limit)
+
+
+@router.get(
+    "/feed/session",
+    response_model=FeedPage
+)
+async def feed_session(
+        user_id: CurrentUserIdDep,
+        db_session: ReadDBSessionDep,
+        cursor: str | None = Query(None, max_length=64),
+        all_images: bool = Query(False),
+) -> FeedPage:
+    images_limit = None if all_images else config.FEED_IMAGES_PER_PLACE
+    return await service.get_feed_page(db_session, user_id, cursor, images_limit)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
 @router.get(
     "/comments",
     response_model=list[PlaceComment]
 )
 async def comments(
-        user: CurrentUserDep,
-        db_session: DBSessionDep,
+        user_id: CurrentUserIdDep,
+        request: Request,
         place_id: uuid.UUID = Query(),
-) -> list[PlaceComment]:
-    return await service.get_comments(db_session, place_id)
+        limit: int = Query(10, ge=1, le=100),
+        cursor: str | None = Query(None, max_length=256),
+        if_none_match: str | None = Header(None),
+) -> Response:
+    page, version = await service.get_cached_comments(place_id, limit, cursor)
+    if page is None:
+        # the session is only opened on a cache miss
+        async with read_db_session(request) as db_session:
+            page = await service.get_comments_page(db_session, place_id, limit, cursor, version)
+
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"}
+    if page.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if if_none_match and etag_matches(if_none_match, page.etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
 
 
 @router.post(
@@ -71,12 +154,12 @@ async def comments(
     status_code=HTTP_204_NO_CONTENT
 )
 async def comment(
-        user: CurrentUserDep,
+        user_id: CurrentUserIdDep,
         db_session: DBSessionDep,
         comment: PlaceCommentSchema,
 ) -> None:
     try:
-        await service.add_comment(db_session, user.id, comment)
+        await service.add_comment(db_session, user_id, comment)
     except ValueError as e:
         raise HTTPException(
             status_code=HTTP_400_BAD_REQUEST,
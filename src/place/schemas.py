@@ -3,7 +3,9 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Literal, Optional
 
-from pydantic import BaseModel, constr, condecimal
+from pydantic import BaseModel, constr, condecimal, conlist
+
+from src.schemas import Coordinate
 
 
 class ReactionData(BaseModel):
@@ -11,6 +13,26 @@ class ReactionData(BaseModel):
     reaction: Literal['like', 'dislike']
 
 
+class BatchReactionItem(BaseModel):
+    place_id: uuid.UUID
+    reaction: Literal['like', 'dislike']
+    created_at: Optional[datetime] = None  # when the user swiped, defaults to the time of the upload
+
+
+class BatchReactionData(BaseModel):
+    reactions: conlist(BatchReactionItem, min_length=1, max_length=500)
+
+
+class BatchReactionResult(BaseModel):
+    place_id: uuid.UUID
+    status: Literal['added', 'duplicate', 'invalid_place']
+
+
+class BatchReactionResponse(BaseModel):
+    added: int
+    results: list[BatchReactionResult]  # in the order of the request
+
+
 class SuccessResponse(BaseModel):
     success: bool
     message: str
@@ -19,26 +41,46 @@ class SuccessResponse(BaseModel):
 class PlaceTypeMin(BaseModel):
     type: str
 
+    class Config:
+        from_attributes = True
+
 
 class PlaceImageMin(BaseModel):
     image_url: str
 
+    class Config:
+        from_attributes = True
+
 
 class PlaceReactionMin(BaseModel):
     reaction: Literal['like', 'dislike']
     created_at: datetime
 
+    class Config:
+        from_attributes = True
+
 
 class PlaceMin(BaseModel):
     id: uuid.UUID
     name: str
     # place_id: str
-    latitude: Decimal
-    longitude: Decimal
+    latitude: Coordinate
+    longitude: Coordinate
     created_at: datetime
+    user_rating: Optional[Decimal] = None  # mean rating of the comments
+    user_rating_count: int = 0
     types: list[PlaceTypeMin]
     images: list[PlaceImageMin]
     reactions: Optional[list[PlaceReactionMin]] = []  # not always loaded
+    distance_km: Optional[float] = None  # only for location-aware queries
+
+    class Config:
+        from_attributes = True
+
+
+class FeedPage(BaseModel):
+    cursor: Optional[str]  # pass back to get the next page, None once the feed is exhausted
+    places: list[PlaceMin]
 
 
 class ReactionsList(BaseModel):
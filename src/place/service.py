@@ -1,244 +1,582 @@
-import math
+import hashlib
+import secrets
 import uuid
+from datetime import datetime, timezone
+from itertools import chain
 
-from sqlalchemy import select, desc, func, case, and_
+from pydantic import TypeAdapter
+from sqlalchemy import select, update, desc, func, case, literal, literal_column, tuple_, cast, null, text, Float, \
+    Numeric, Text, Select, ColumnElement
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by, UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
-from src.models import PlaceReactionModel, UserModel, PlaceModel, PlaceImageModel, PlaceTypeModel, PlaceCommentModel
-from src.place.exceptions import InvalidPlaceException
-from src.place.schemas import ReactionData, PlaceMin, PlaceImageMin, PlaceTypeMin, PlaceReactionMin, PlaceCommentSchema
-from src.schemas import PlaceScheme, PlaceReactionScheme, PlaceImageScheme, PlaceTypeScheme, PlaceComment
+from src import config
+from src.models import PlaceReactionModel, UserModel, PlaceModel, PlaceImageModel, PlaceTypeModel, PlaceCommentModel, \
+    UserTypePreferenceModel, UserFeedCandidateModel, ImageSourceModel
+from src.pagination import encode_cursor, decode_cursor
+from src.place.cache import idf_cache, top_rated_cache, feed_sessions, FeedSession, comments_cache, CommentsPage
+from src.place.constants import COMMON_TYPES, REACTION_WEIGHTS, COLD_START_REACTIONS, TOP_RATED_ORDER
+from src.place.exceptions import InvalidPlaceException, ReactionAlreadyExists
+from src.place.geo import GeoArea, within_area, decay_by_distance, distance_km, haversine_km
+from src.place.images import image_url_sql
+from src.place.schemas import ReactionData, BatchReactionItem, BatchReactionResult, BatchReactionResponse, \
+    FeedPage, PlaceMin, PlaceImageMin, PlaceTypeMin, PlaceReactionMin, PlaceCommentSchema
+from src.schemas import PlaceScheme, PlaceComment
 
 
-async def add_reaction(db_session: AsyncSession, reaction_data: ReactionData, user: UserModel) -> None:
+EMPTY_JSON_ARRAY = text("'[]'::json")
+
+comments_adapter = TypeAdapter(list[PlaceComment])
+
+
+def json_coordinate(column: ColumnElement[float]) -> ColumnElement:
+    if config.LEGACY_COORDINATE_STRINGS:
+        # the text legacy_coordinate renders: postgres 12+ prints float8 as the shortest exact value like repr,
+        # a direct float8 -> numeric cast would keep only 15 significant digits
+        return cast(func.round(cast(cast(column, Text), Numeric), 20), Text)
+    return column
+
+
+def json_object(**fields: ColumnElement) -> ColumnElement:
+    # keys are rendered inline, postgres can't infer the type of json_build_object parameters
+    return func.json_build_object(*chain.from_iterable(
+        (literal_column(f"'{key}'"), value) for key, value in fields.items()
+    ))
+
+
+async def add_reaction(db_session: AsyncSession, reaction_data: ReactionData, user_id: uuid.UUID) -> None:
     db_reaction = PlaceReactionModel(
         place_id=reaction_data.place_id,
-        user_id=user.id,
+        user_id=user_id,
         reaction=reaction_data.reaction
     )
     db_session.add(db_reaction)
     try:
-        await db_session.commit()
-        await db_session.refresh(db_reaction)
-    except IntegrityError:
+        await db_session.flush()
+    except IntegrityError as e:
+        if 'uq_place_reaction_user_id_place_id' in str(e.orig):
+            raise ReactionAlreadyExists()
         raise InvalidPlaceException()
 
+    reactions = {reaction_data.place_id: reaction_data.reaction}
+    await update_reaction_counters(db_session, user_id, reactions)
+    await update_type_preferences(db_session, user_id, reactions)
+    await db_session.commit()
 
-async def get_user_reactions(db_session: AsyncSession, user: UserModel, offset: int, limit: int) -> list[PlaceScheme]:
-    query = (
+
+async def add_reactions(db_session: AsyncSession, reactions: list[BatchReactionItem],
+                        user_id: uuid.UUID) -> BatchReactionResponse:
+    # Only the first reaction to a place counts, the same as replaying the swipes one by one
+    first_reactions: dict[uuid.UUID, BatchReactionItem] = {}
+    for item in reactions:
+        first_reactions.setdefault(item.place_id, item)
+
+    existing_places_query = select(PlaceModel.id).where(PlaceModel.id.in_(first_reactions))
+    existing_places = set((await db_session.execute(existing_places_query)).scalars().all())
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [
+        {
+            'place_id': item.place_id,
+            'user_id': user_id,
+            'reaction': item.reaction,
+            'created_at': _to_utc(item.created_at, now),
+        }
+        for item in first_reactions.values()
+        if item.place_id in existing_places
+    ]
+
+    added: dict[uuid.UUID, str] = {}
+    if rows:
+        insert_query = (
+            insert(PlaceReactionModel)
+            .values(rows)
+            .on_conflict_do_nothing(constraint='uq_place_reaction_user_id_place_id')
+            .returning(PlaceReactionModel.place_id, PlaceReactionModel.reaction)
+        )
+        added = dict((await db_session.execute(insert_query)).all())
+
+    if added:
+        await update_reaction_counters(db_session, user_id, added)
+        await update_type_preferences(db_session, user_id, added)
+    await db_session.commit()
+
+    results = []
+    for item in reactions:
+        if item.place_id not in existing_places:
+            status = 'invalid_place'
+        elif item.place_id in added and first_reactions[item.place_id] is item:
+            status = 'added'
+        else:
+            status = 'duplicate'
+        results.append(BatchReactionResult(place_id=item.place_id, status=status))
+
+    return BatchReactionResponse(added=len(added), results=results)
+
+
+def _to_utc(created_at: datetime | None, now: datetime) -> datetime:
+    # reaction timestamps are stored as naive UTC, and clients can't react in the future
+    if created_at is None:
+        return now
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(created_at, now)
+
+
+async def update_reaction_counters(db_session: AsyncSession, user_id: uuid.UUID,
+                                   reactions: dict[uuid.UUID, str]) -> None:
+    """
+    Count new reactions (place id -> reaction) of a user into the user and place counters.
+    """
+    reactions_by_type = _group_by_reaction(reactions)
+    await db_session.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(
+            like_count=UserModel.like_count + len(reactions_by_type.get('like', [])),
+            dislike_count=UserModel.dislike_count + len(reactions_by_type.get('dislike', []))
+        )
+    )
+    for reaction, place_ids in reactions_by_type.items():
+        counter = 'like_count' if reaction == 'like' else 'dislike_count'
+        await db_session.execute(
+            update(PlaceModel)
+            .where(PlaceModel.id.in_(place_ids))
+            .values({counter: getattr(PlaceModel, counter) + 1})
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def update_type_preferences(db_session: AsyncSession, user_id: uuid.UUID,
+                                  reactions: dict[uuid.UUID, str]) -> None:
+    # Add the reaction weights to the user's score for every type of the places,
+    # so the feed never has to re-aggregate the whole reaction history
+    reactions_by_type = _group_by_reaction(reactions)
+    insert_query = insert(UserTypePreferenceModel).from_select(
+        ['user_id', 'type', 'score'],
+        select(
+            literal(user_id, UUID(as_uuid=True)),
+            PlaceTypeModel.type,
+            func.sum(
+                case(
+                    *[(PlaceTypeModel.place_id.in_(place_ids), literal(REACTION_WEIGHTS[reaction], Float))
+                      for reaction, place_ids in reactions_by_type.items()],
+                    else_=0
+                )
+            )
+        )
+        .where(PlaceTypeModel.place_id.in_(reactions))
+        .group_by(PlaceTypeModel.type)
+    )
+    upsert_query = insert_query.on_conflict_do_update(
+        index_elements=[UserTypePreferenceModel.user_id, UserTypePreferenceModel.type],
+        set_={'score': UserTypePreferenceModel.score + insert_query.excluded.score}
+    )
+    await db_session.execute(upsert_query)
+
+
+def _group_by_reaction(reactions: dict[uuid.UUID, str]) -> dict[str, list[uuid.UUID]]:
+    reactions_by_type: dict[str, list[uuid.UUID]] = {}
+    for place_id, reaction in reactions.items():
+        reactions_by_type.setdefault(reaction, []).append(place_id)
+    return reactions_by_type
+
+
+async def get_user_reactions(db_session: AsyncSession, user_id: uuid.UUID, offset: int, limit: int,
+                             cursor: str | None = None) -> tuple[str, str | None]:
+    """
+    Get a page of the reacted places as a ready JSON array in the shape of list[PlaceMin].
+
+    Postgres builds the JSON of every place, so no model is constructed or validated per row.
+    """
+    page = (
         select(
-            PlaceModel,
-            PlaceReactionModel,
-            func.array(
-                select(
-                    func.row(PlaceImageModel.place_id, PlaceImageModel.image_url, PlaceImageModel.created_at)
-                ).where(PlaceImageModel.place_id == PlaceModel.id)
-                .scalar_subquery()
-            ).label("images"),
-            func.array(
-                select(
-                    func.row(PlaceTypeModel.place_id, PlaceTypeModel.type, PlaceTypeModel.created_at)
-                ).where(PlaceTypeModel.place_id == PlaceModel.id)
-                .scalar_subquery()
-            ).label("types")
+            PlaceReactionModel.id,
+            PlaceReactionModel.place_id,
+            PlaceReactionModel.reaction,
+            PlaceReactionModel.created_at
         )
-        .join(PlaceReactionModel)
+        .filter(PlaceReactionModel.user_id == user_id)
+        .order_by(desc(PlaceReactionModel.created_at), desc(PlaceReactionModel.id))
         .offset(offset)
         .limit(limit)
-        .filter(PlaceReactionModel.user_id == user.id)
-        .order_by(desc(PlaceReactionModel.created_at))
     )
+    if cursor:
+        # Keyset pagination: continue right after the last reaction of the previous page
+        page = page.filter(
+            tuple_(PlaceReactionModel.created_at, PlaceReactionModel.id) < decode_cursor(cursor)
+        )
+    page = page.subquery('page')
 
-    result = await db_session.execute(query)
-    places = result.fetchall()
-
-    return [
-        PlaceScheme(
-            id=place[0].id,
-            name=place[0].name,
-            place_id=place[0].place_id,
-            latitude=place[0].latitude,
-            longitude=place[0].longitude,
-            created_at=place[0].created_at,
-            reactions=[PlaceReactionScheme(
-                id=place[1].id,
-                reaction=place[1].reaction,
-                created_at=place[1].created_at
-            )],
-            images=[
-                PlaceImageScheme(
-                    place_id=image[0],
-                    image_url=image[1],
-                    created_at=image[2],
-                )
-                for image in place[2]
-            ],
-            types=[
-                PlaceTypeScheme(
-                    place_id=type_[0],
-                    type=type_[1],
-                    created_at=type_[2],
-                )
-                for type_ in place[3]
-            ],
+    types = (
+        select(
+            func.coalesce(func.json_agg(json_object(type=PlaceTypeModel.type)), EMPTY_JSON_ARRAY)
         )
-        for place in places
-    ]
+        .where(PlaceTypeModel.place_id == PlaceModel.id)
+        .scalar_subquery()
+    )
+    images = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(json_object(image_url=image_url_sql()), PlaceImageModel.position)
+                ),
+                EMPTY_JSON_ARRAY
+            )
+        )
+        .select_from(PlaceImageModel)
+        .join(ImageSourceModel, ImageSourceModel.id == PlaceImageModel.source_id)
+        .where(PlaceImageModel.place_id == PlaceModel.id)
+        .scalar_subquery()
+    )
+    # same keys and formats as PlaceMin, decimals are rendered as strings like pydantic does
+    place_json = json_object(
+        id=PlaceModel.id,
+        name=PlaceModel.name,
+        latitude=json_coordinate(PlaceModel.latitude),
+        longitude=json_coordinate(PlaceModel.longitude),
+        created_at=PlaceModel.created_at,
+        user_rating=cast(PlaceModel.user_rating, Text),
+        user_rating_count=PlaceModel.user_rating_count,
+        types=types,
+        images=images,
+        reactions=func.json_build_array(json_object(reaction=page.c.reaction, created_at=page.c.created_at)),
+        distance_km=null()
+    )
 
+    query = (
+        select(cast(place_json, Text), page.c.created_at, page.c.id)
+        .join(PlaceModel, PlaceModel.id == page.c.place_id)
+        .order_by(desc(page.c.created_at), desc(page.c.id))
+    )
 
-# Content-Based Recommendation System with TF-IDF Weighting
-async def get_user_feed(db_session: AsyncSession, user: UserModel, ignore_ids: list[uuid.UUID]) -> list[PlaceScheme]:
-    # Ignore overly common types that don't provide meaningful differentiation
-    COMMON_TYPES = {"establishment", "point_of_interest", "tourist_attraction"}
+    result = await db_session.execute(query)
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][2])
+
+    return "[" + ",".join(row[0] for row in rows) + "]", next_cursor
 
-    # Count the number of user reactions
+
+async def get_reaction_count(db_session: AsyncSession, user_id: uuid.UUID) -> int:
     count_query = (
-        select(func.count())
-        .select_from(PlaceReactionModel)
-        .filter(PlaceReactionModel.user_id == user.id)
+        select(UserModel.like_count + UserModel.dislike_count)
+        .where(UserModel.id == user_id)
     )
     count_result = await db_session.execute(count_query)
-    reaction_count = count_result.scalar()
+    return count_result.scalar() or 0
 
-    # For new users with fewer than 50 reactions - show them high-rated unrated places
-    if reaction_count < 50:
-        query = (
-            select(PlaceModel)
-            .options(
-                selectinload(PlaceModel.images),
-                selectinload(PlaceModel.types)
-            )
-            .filter(~PlaceModel.reactions.any(PlaceReactionModel.user_id == user.id))
-            .filter(~PlaceModel.id.in_(ignore_ids) if ignore_ids else True)
-            .order_by(PlaceModel.rating.desc().nullslast())
-            .limit(10)
-        )
-    else:
-        # Get the total number of places for IDF calculation
-        total_places_query = select(func.count()).select_from(PlaceModel)
-        total_places_result = await db_session.execute(total_places_query)
-        total_places = total_places_result.scalar()
 
-        # Get count of places for each type (excluding common types)
-        type_counts_query = (
-            select(
-                PlaceTypeModel.type,
-                func.count().label('type_count')
-            )
-            .group_by(PlaceTypeModel.type)
-            .filter(~PlaceTypeModel.type.in_(COMMON_TYPES))
+async def get_top_type_scores(db_session: AsyncSession, user_id: uuid.UUID,
+                              reaction_count: int | None = None) -> list[tuple[str, float]]:
+    if reaction_count is None:
+        reaction_count = await get_reaction_count(db_session, user_id)
+
+    # New users don't have meaningful preferences yet
+    if reaction_count < COLD_START_REACTIONS:
+        return []
+
+    # Get the IDF of every type, cached until the place catalog changes
+    type_idf = await idf_cache.get(db_session)
+
+    # Get user preferences, maintained incrementally by add_reaction
+    user_preferences_query = (
+        select(
+            UserTypePreferenceModel.type,
+            UserTypePreferenceModel.score
+        )
+        .where(
+            UserTypePreferenceModel.user_id == user_id,
+            ~UserTypePreferenceModel.type.in_(COMMON_TYPES)  # Exclude common types
         )
-        type_counts_result = await db_session.execute(type_counts_query)
-        type_counts = {row[0]: row[1] for row in type_counts_result.all()}
+    )
+
+    user_preferences_result = await db_session.execute(user_preferences_query)
+    user_preferences = user_preferences_result.all()
+
+    # Calculate TF-IDF score for each type
+    type_scores = []
+    for type_name, raw_score in user_preferences:
+        if type_name in type_idf:
+            # TF (term frequency) - how much the user likes this type
+            # IDF (inverse document frequency) - how rare/specific the type is
+            tf_idf_score = raw_score * type_idf[type_name]
+            type_scores.append((type_name, tf_idf_score))
+
+    # Sort types by TF-IDF score and take top 5 with positive scores
+    type_scores.sort(key=lambda x: x[1], reverse=True)
+    return [t for t in type_scores[:5] if t[1] > 0]
+
 
-        # Get user preferences from their reactions
-        user_preferences_query = (
+# Content-Based Recommendation System with TF-IDF Weighting
+async def build_feed_query(db_session: AsyncSession, user_id: uuid.UUID, ignore_ids: list[uuid.UUID], limit: int,
+                           area: GeoArea | None = None, exclude_reacted: bool = True,
+                           reaction_count: int | None = None) -> Select:
+    query = select(PlaceModel)
+    if exclude_reacted:
+        query = query.filter(~PlaceModel.reactions.any(PlaceReactionModel.user_id == user_id))
+    if ignore_ids:
+        query = query.filter(~PlaceModel.id.in_(ignore_ids))
+    if area is not None:
+        query = query.filter(within_area(area))
+
+    top_type_scores = await get_top_type_scores(db_session, user_id, reaction_count)
+
+    if not top_type_scores:
+        # New users, or no relevant types found - show high-rated places
+        if area is not None:
+            # +1 so that unrated places are still ordered by distance
+            query = query.order_by(
+                decay_by_distance(func.coalesce(PlaceModel.rating, PlaceModel.user_rating, 0) + 1, area).desc()
+            )
+        else:
+            query = query.order_by(*TOP_RATED_ORDER)
+    else:
+        # Find places with relevant types
+        # Use CTE to calculate relevance score for each place
+        place_scores = (
             select(
-                PlaceTypeModel.type,
+                PlaceTypeModel.place_id,
                 func.sum(
                     case(
-                        (PlaceReactionModel.reaction == 'like', 1),
-                        (PlaceReactionModel.reaction == 'dislike', -0.5),
+                        *[(PlaceTypeModel.type == type_name, score) for type_name, score in top_type_scores],
                         else_=0
                     )
-                ).label('raw_score')
+                ).label('relevance_score')
             )
-            .join(PlaceModel, PlaceTypeModel.place_id == PlaceModel.id)
-            .join(PlaceReactionModel, PlaceReactionModel.place_id == PlaceModel.id)
-            .where(
-                and_(
-                    PlaceReactionModel.user_id == user.id,
-                    ~PlaceTypeModel.type.in_(COMMON_TYPES)  # Exclude common types
-                )
-            )
-            .group_by(PlaceTypeModel.type)
+            .filter(PlaceTypeModel.type.in_([type_name for type_name, _ in top_type_scores]))
+            .group_by(PlaceTypeModel.place_id)
+            .cte('place_scores')
         )
 
-        user_preferences_result = await db_session.execute(user_preferences_query)
-        user_preferences = user_preferences_result.all()
-
-        # Calculate TF-IDF score for each type
-        type_scores = []
-        for type_name, raw_score in user_preferences:
-            if type_name in type_counts and type_counts[type_name] > 0:
-                # TF (term frequency) - how much the user likes this type
-                # IDF (inverse document frequency) - how rare/specific the type is
-                idf = math.log(total_places / type_counts[type_name])
-                tf_idf_score = raw_score * idf
-                type_scores.append((type_name, tf_idf_score))
-
-        # Sort types by TF-IDF score and take top 5 with positive scores
-        type_scores.sort(key=lambda x: x[1], reverse=True)
-        top_types = [t[0] for t in type_scores[:5] if t[1] > 0]
-
-        if not top_types:
-            # Fallback: If no relevant types found, show high-rated places
-            query = (
-                select(PlaceModel)
-                .options(
-                    selectinload(PlaceModel.images),
-                    selectinload(PlaceModel.types)
-                )
-                .filter(~PlaceModel.reactions.any(PlaceReactionModel.user_id == user.id))
-                .filter(~PlaceModel.id.in_(ignore_ids) if ignore_ids else True)
-                .order_by(PlaceModel.rating.desc().nullslast())
-                .limit(10)
-            )
+        # Final query: join with relevance scores and sort
+        if exclude_reacted:
+            query = query.join(place_scores, PlaceModel.id == place_scores.c.place_id)
+            relevance_score = place_scores.c.relevance_score
         else:
-            # Find places with relevant types
-            # Use CTE to calculate relevance score for each place
-            place_scores = (
-                select(
-                    PlaceTypeModel.place_id,
-                    func.sum(
-                        case(
-                            *[(PlaceTypeModel.type == t, type_scores[i][1])
-                              for i, t in enumerate(top_types) if i < len(type_scores)],
-                            else_=0
-                        )
-                    ).label('relevance_score')
-                )
-                .filter(PlaceTypeModel.type.in_(top_types))
-                .group_by(PlaceTypeModel.place_id)
-                .cte('place_scores')
+            # Nearby lists every place around, the ones without a relevant type just rank last
+            query = query.outerjoin(place_scores, PlaceModel.id == place_scores.c.place_id)
+            relevance_score = func.coalesce(place_scores.c.relevance_score, 0)
+        if area is not None:
+            # distance breaks the ties, e.g. between the places that score 0
+            query = query.order_by(
+                decay_by_distance(relevance_score, area).desc(), distance_km(area), *TOP_RATED_ORDER
             )
+        else:
+            query = query.order_by(relevance_score.desc(), *TOP_RATED_ORDER)
+
+    return query.limit(limit)
+
+
+async def get_feed_candidates(db_session: AsyncSession, user_id: uuid.UUID, ignore_ids: list[uuid.UUID], limit: int,
+                              area: GeoArea | None = None) -> list[uuid.UUID]:
+    """
+    Best unseen places among the ones precomputed for the user by the offline recommender.
+    """
+    query = (
+        select(UserFeedCandidateModel.place_id)
+        .where(UserFeedCandidateModel.user_id == user_id)
+        # candidates can be hours old, skip what the user has reacted to since
+        .filter(~select(PlaceReactionModel.id).where(
+            PlaceReactionModel.user_id == user_id,
+            PlaceReactionModel.place_id == UserFeedCandidateModel.place_id
+        ).exists())
+    )
+    if ignore_ids:
+        query = query.filter(~UserFeedCandidateModel.place_id.in_(ignore_ids))
+    if area is not None:
+        query = (
+            query.join(PlaceModel, PlaceModel.id == UserFeedCandidateModel.place_id)
+            .filter(within_area(area))
+            .order_by(decay_by_distance(UserFeedCandidateModel.score, area).desc())
+        )
+    else:
+        query = query.order_by(UserFeedCandidateModel.rank)
+
+    result = await db_session.execute(query.limit(limit))
+    return list(result.scalars().all())
+
+
+async def get_cold_start_feed(db_session: AsyncSession, user_id: uuid.UUID, ignore_ids: list[uuid.UUID],
+                              limit: int, reaction_count: int) -> list[uuid.UUID] | None:
+    """
+    Walk the cached top rated ranking for users without meaningful preferences yet.
+
+    Returns None for other users, or when the user has gone past the end of the cached ranking.
+    """
+    if reaction_count >= COLD_START_REACTIONS:
+        return None
+
+    # a few dozen rows at most, read by ix_place_reaction_user_id_created_at
+    reacted_query = select(PlaceReactionModel.place_id).where(PlaceReactionModel.user_id == user_id)
+    skipped = set((await db_session.execute(reacted_query)).scalars().all())
+    skipped.update(ignore_ids)
+
+    ranking = await top_rated_cache.get(db_session)
+    place_ids = []
+    for place_id in ranking:
+        if place_id not in skipped:
+            place_ids.append(place_id)
+            if len(place_ids) == limit:
+                return place_ids
+
+    # places below the cached part of the ranking are only reachable through the full query
+    return place_ids if len(ranking) < top_rated_cache.size else None
 
-            # Final query: join with relevance scores and sort
-            query = (
-                select(PlaceModel)
-                .options(
-                    selectinload(PlaceModel.images),
-                    selectinload(PlaceModel.types)
-                )
-                .join(place_scores, PlaceModel.id == place_scores.c.place_id)
-                .filter(~PlaceModel.reactions.any(PlaceReactionModel.user_id == user.id))
-                .filter(~PlaceModel.id.in_(ignore_ids) if ignore_ids else True)
-                .order_by(
-                    place_scores.c.relevance_score.desc(),
-                    PlaceModel.rating.desc().nullslast()
-                )
-                .limit(10)
-            )
+
+async def rank_feed(db_session: AsyncSession, user_id: uuid.UUID, ignore_ids: list[uuid.UUID], limit: int,
+                    area: GeoArea | None = None, exclude_reacted: bool = True) -> list[uuid.UUID]:
+    """
+    Ids of the next feed places: recommender candidates first, then the cached top rated ranking
+    for cold-start users or the TF-IDF ranking for everyone else.
+    """
+    place_ids = await get_feed_candidates(db_session, user_id, ignore_ids, limit, area) if exclude_reacted else []
+    if len(place_ids) >= limit:
+        return place_ids
+
+    # read once, both the cold-start check and the TF-IDF ranking need it
+    reaction_count = await get_reaction_count(db_session, user_id)
+    if area is None and exclude_reacted:
+        cold_start_ids = await get_cold_start_feed(
+            db_session, user_id, ignore_ids + place_ids, limit - len(place_ids), reaction_count
+        )
+        if cold_start_ids is not None:
+            return place_ids + cold_start_ids
+    query = await build_feed_query(
+        db_session, user_id, ignore_ids + place_ids, limit - len(place_ids), area, exclude_reacted, reaction_count
+    )
+    result = await db_session.execute(query.with_only_columns(PlaceModel.id))
+    place_ids.extend(result.scalars().all())
+    return place_ids
+
+
+async def get_user_feed(db_session: AsyncSession, user_id: uuid.UUID, ignore_ids: list[uuid.UUID],
+                        limit: int = config.FEED_PAGE_SIZE, area: GeoArea | None = None,
+                        exclude_reacted: bool = True, images_limit: int | None = None) -> list[PlaceScheme]:
+    place_ids = await rank_feed(db_session, user_id, ignore_ids, limit, area, exclude_reacted)
+    places = await get_places(db_session, place_ids, images_limit)
+    if area is not None:
+        for place in places:
+            place.distance_km = haversine_km(area.latitude, area.longitude, place.latitude, place.longitude)
+    return places
+
+
+async def get_nearby_places(db_session: AsyncSession, user_id: uuid.UUID, area: GeoArea,
+                            limit: int) -> list[PlaceScheme]:
+    # Every place around, including the ones the user has already reacted to
+    return await get_user_feed(db_session, user_id, [], limit, area, exclude_reacted=False)
+
+
+async def get_places(db_session: AsyncSession, place_ids: list[uuid.UUID],
+                     images_limit: int | None = None) -> list[PlaceScheme]:
+    """
+    The places in the order of place_ids, with their first images_limit images, or all of them when None.
+    """
+    if not place_ids:
+        return []
+
+    query = (
+        select(PlaceModel)
+        .options(
+            selectinload(PlaceModel.images),
+            selectinload(PlaceModel.types)
+        )
+        .filter(PlaceModel.id.in_(place_ids))
+    )
 
     result = await db_session.execute(query)
-    places = result.unique().scalars().all()
-    return [PlaceScheme.model_validate(place) for place in places]
+    places = {place.id: place for place in result.unique().scalars().all()}
+    # keep the order of place_ids, skipping places that were deleted in the meantime
+    schemes = [PlaceScheme.model_validate(places[place_id]) for place_id in place_ids if place_id in places]
+    if images_limit is not None:
+        for scheme in schemes:
+            del scheme.images[images_limit:]
+    return schemes
+
+
+async def get_feed_page(db_session: AsyncSession, user_id: uuid.UUID, cursor: str | None,
+                        images_limit: int | None = None) -> FeedPage:
+    # Rank a large candidate pool once and serve it page by page from the session store,
+    # instead of re-running the ranking with an ever-growing ignore list on every swipe
+    feed_session = await feed_sessions.get(cursor) if cursor else None
+    if feed_session is None or feed_session.user_id != user_id:
+        # unknown, expired or foreign cursor - start a new session
+        cursor = secrets.token_urlsafe(16)
+        feed_session = FeedSession(user_id=user_id)
+
+    if len(feed_session.candidates) < config.FEED_PAGE_SIZE:
+        # Refill the pool, skipping everything this session has already shown or queued
+        feed_session.candidates.extend(await rank_feed(
+            db_session, user_id,
+            list(feed_session.served) + feed_session.candidates,
+            config.FEED_SESSION_POOL_SIZE
+        ))
 
+    page_ids = feed_session.candidates[:config.FEED_PAGE_SIZE]
+    del feed_session.candidates[:config.FEED_PAGE_SIZE]
+    feed_session.served.update(page_ids)
 
-async def get_comments(db_session: AsyncSession, place_id: uuid.UUID) -> list[PlaceComment]:
+    places = await get_places(db_session, page_ids, images_limit)
+    if not places:
+        # the user has seen everything there is to rank
+        await feed_sessions.delete(cursor)
+        return FeedPage(cursor=None, places=[])
+
+    await feed_sessions.set(cursor, feed_session)
+    return FeedPage(cursor=cursor, places=places)
+
+
+async def get_comments(db_session: AsyncSession, place_id: uuid.UUID, limit: int = 10,
+                       cursor: str | None = None) -> tuple[list[PlaceComment], str | None]:
     query = (
         select(PlaceCommentModel)
         .options(selectinload(PlaceCommentModel.user))  # тянем user
         .where(PlaceCommentModel.place_id == place_id)
-        .order_by(desc(PlaceCommentModel.created_at))
-        .limit(10)
+        .order_by(desc(PlaceCommentModel.created_at), desc(PlaceCommentModel.id))
+        .limit(limit)
     )
+    if cursor:
+        # Keyset pagination: continue right after the last comment of the previous page
+        query = query.filter(
+            tuple_(PlaceCommentModel.created_at, PlaceCommentModel.id) < decode_cursor(cursor)
+        )
 
     result = await db_session.execute(query)
     comments = result.unique().scalars().all()
-    return [PlaceComment.model_validate(comment) for comment in comments]
+
+    next_cursor = None
+    if len(comments) == limit:
+        next_cursor = encode_cursor(comments[-1].created_at, comments[-1].id)
+
+    return [PlaceComment.model_validate(comment) for comment in comments], next_cursor
+
+
+async def get_cached_comments(place_id: uuid.UUID, limit: int,
+                              cursor: str | None) -> tuple[CommentsPage | None, str]:
+    return await comments_cache.get(place_id, limit, cursor)
+
+
+async def get_comments_page(db_session: AsyncSession, place_id: uuid.UUID, limit: int, cursor: str | None,
+                            version: str) -> CommentsPage:
+    """
+    Load a page of comments, serialize it and store it in the comments cache under `version`.
+    """
+    comments, next_cursor = await get_comments(db_session, place_id, limit, cursor)
+    body = comments_adapter.dump_json(comments)
+    page = CommentsPage(
+        body=body.decode(),
+        etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        next_cursor=next_cursor
+    )
+
+    # a lagging replica may miss the comment that created this version, don't cache its view of it
+    if not db_session.info.get("replica") or comments_cache.version_age(version) > config.DATABASE_REPLICA_MAX_LAG:
+        await comments_cache.set(place_id, version, limit, cursor, page)
+    return page
 
 
 async def add_comment(db_session: AsyncSession, user_id: uuid.UUID, comment: PlaceCommentSchema) -> None:
@@ -251,6 +589,19 @@ async def add_comment(db_session: AsyncSession, user_id: uuid.UUID, comment: Pla
 
     db_session.add(new_comment)
     try:
-        await db_session.commit()
+        await db_session.flush()
     except IntegrityError:
         raise ValueError("Error inserting the comment")
+
+    # keep the place aggregate in the same transaction as the comment
+    await db_session.execute(
+        update(PlaceModel)
+        .where(PlaceModel.id == comment.place_id)
+        .values(
+            user_rating_count=PlaceModel.user_rating_count + 1,
+            user_rating_sum=PlaceModel.user_rating_sum + comment.rating
+        )
+    )
+    await db_session.commit()
+
+    await comments_cache.invalidate(comment.place_id)
@@ -0,0 +1,164 @@
+"""
+Opt-in SQL profiling of single requests, and a slow query log.
+
+A profiled request records every statement it executes. The response then carries a short
+summary in the X-Debug-* headers, and the full one is logged, including the statement shapes
+that repeat (usually an N+1). Requests are profiled when PROFILING_ENABLED is set, or when
+they send `X-Debug-Profile: 1` and PROFILING_ALLOW_HEADER is set.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged whether or not the request is
+profiled. With SLOW_QUERY_EXPLAIN, slow SELECTs are also run through EXPLAIN ANALYZE on a
+separate connection, at most once per statement shape and cache period.
+"""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src import config
+from src.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-debug-profile"
+
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_PARAMETER_LIST = re.compile(r"\?(::\w+)?(?:\s*,\s*\?(?:::\w+)?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    The statement without parameters and with expanded IN lists collapsed, so that the same
+    query with different values has the same shape.
+    """
+    shape = _PARAMETER.sub("?", statement)
+    shape = _PARAMETER_LIST.sub(r"?\1, ...", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class RequestProfile:
+    statements: list[tuple[str, float]] = field(default_factory=list)  # (shape, seconds)
+
+    @property
+    def query_time(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def repeated(self) -> list[tuple[str, int]]:
+        counts = Counter(shape for shape, _ in self.statements)
+        return [(shape, count) for shape, count in counts.most_common() if count >= config.PROFILING_REPEAT_THRESHOLD]
+
+
+current_profile: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar("current_profile", default=None)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _is_profiled(self, scope: Scope) -> bool:
+        if config.PROFILING_ENABLED:
+            return True
+        return config.PROFILING_ALLOW_HEADER and dict(scope["headers"]).get(PROFILE_HEADER) == b"1"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_profiled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # the summary as of the response start, statements after it only reach the log
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-debug-query-count", str(len(profile.statements)).encode()),
+                    (b"x-debug-query-time-ms", f"{profile.query_time * 1000:.1f}".encode()),
+                    (b"x-debug-repeated-queries", str(len(profile.repeated())).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            log_profile(scope, profile, time.perf_counter() - start)
+
+
+def log_profile(scope: Scope, profile: RequestProfile, duration: float) -> None:
+    lines = [
+        f"{scope['method']} {scope['path']}: {duration * 1000:.1f} ms, "
+        f"{len(profile.statements)} queries in {profile.query_time * 1000:.1f} ms"
+    ]
+    for shape, statement_duration in profile.statements:
+        lines.append(f"  {statement_duration * 1000:8.2f} ms  {shape[:300]}")
+    for shape, count in profile.repeated():
+        lines.append(f"  repeated {count}x: {shape[:300]}")
+    logger.info("\n".join(lines))
+
+
+# statement shapes explained recently, so a slow hot query isn't explained on every execution
+_explained = TTLCache(1000, config.SLOW_QUERY_EXPLAIN_INTERVAL)
+_explain_tasks: set[asyncio.Task] = set()
+
+
+async def explain_analyze(statement: str, parameters) -> None:
+    # imported here, the database module is not needed unless something is slow
+    from src.database import sessionmanager
+
+    try:
+        async with sessionmanager.connect() as connection:
+            result = await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in result)
+    except Exception:
+        logger.exception("Could not explain the slow query")
+        return
+    logger.warning("Plan of the slow query:\n%s\n%s", statement, plan)
+
+
+def _explain_later(statement: str, parameters) -> None:
+    shape = statement_shape(statement)
+    # EXPLAIN ANALYZE executes the statement, only do it for reads
+    words = set(shape.upper().split())
+    if words & {"INSERT", "UPDATE", "DELETE"} or not shape.upper().startswith(("SELECT", "WITH")):
+        return
+    if _explained.get(shape):
+        return
+    _explained.set(shape, True)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # synchronous engine outside of the event loop
+    task = loop.create_task(explain_analyze(statement, parameters))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    context.profiling_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_statement_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - context.profiling_start
+
+    profile = current_profile.get()
+    if profile is not None:
+        profile.statements.append((statement_shape(statement), duration))
+
+    if config.SLOW_QUERY_THRESHOLD_MS and duration * 1000 >= config.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning("Slow query (%.1f ms): %s", duration * 1000, statement_shape(statement)[:1000])
+        if config.SLOW_QUERY_EXPLAIN and not executemany:
+            _explain_later(statement, parameters)
@@ -1,8 +1,21 @@
 from decimal import Decimal
-from typing import Literal, Optional
+from typing import Annotated, Literal, Optional
 from datetime import datetime
 import uuid
-from pydantic import BaseModel, EmailStr, condecimal, constr
+from pydantic import BaseModel, EmailStr, PlainSerializer, condecimal, constr
+
+from src import config
+
+
+def legacy_coordinate(value: float) -> str:
+    # the shortest repr is the value that was imported, padded like the former DECIMAL(30, 20) columns
+    return f"{Decimal(repr(value)):.20f}"
+
+
+if config.LEGACY_COORDINATE_STRINGS:
+    Coordinate = Annotated[float, PlainSerializer(legacy_coordinate, return_type=str, when_used="json")]
+else:
+    Coordinate = float
 
 
 class UserMiniScheme(BaseModel):
@@ -67,12 +80,15 @@ class PlaceScheme(BaseModel):
     id: uuid.UUID
     name: str
     place_id: str
-    latitude: Decimal
-    longitude: Decimal
+    latitude: Coordinate
+    longitude: Coordinate
     created_at: datetime
+    user_rating: Optional[Decimal] = None  # mean rating of the comments
+    user_rating_count: int = 0
     types: list[PlaceTypeScheme] = []
     images: list[PlaceImageScheme] = []
     reactions: Optional[list[PlaceReactionScheme]] = []  # not always loaded
+    distance_km: Optional[float] = None  # only for location-aware queries
 
     class Config:
         from_attributes = True
@@ -0,0 +1,66 @@
+"""
+Production entry point, runs the app in SERVER_WORKERS uvicorn worker processes:
+
+    python -m src.server
+    SERVER_WORKERS=4 CACHE_BACKEND_URL=redis://localhost:6379/0 python -m src.server
+
+uvloop and httptools are used when they are installed (they are not on Windows), the plain
+asyncio loop and h11 otherwise. On SIGTERM every worker stops accepting connections, lets the
+requests in flight finish for up to SERVER_GRACEFUL_SHUTDOWN_TIMEOUT seconds and then runs the
+shutdown of the app lifespan, which closes the database pools.
+"""
+import importlib.util
+import logging
+import os
+import sys
+
+import uvicorn
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def run() -> None:
+    logging.basicConfig(stream=sys.stdout, level=config.LOGGING_LEVEL)
+    workers = max(1, config.SERVER_WORKERS)
+    if workers > 1 and not config.CACHE_BACKEND_URL:
+        # feed sessions and recent writers would be split between the workers
+        logger.error("Running %d workers needs a shared cache, set CACHE_BACKEND_URL", workers)
+        sys.exit(1)
+    if workers > 1 and config.METRICS_ENABLED and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        logger.warning("Running %d workers without PROMETHEUS_MULTIPROC_DIR, /metrics only shows the worker "
+                       "that serves the scrape", workers)
+
+    loop, http = event_loop(), http_protocol()
+    logger.info("Starting %d workers on %s:%d (%s, %s)", workers, config.SERVER_HOST, config.SERVER_PORT, loop, http)
+    uvicorn.run(
+        # an import string, every worker process imports the app itself
+        "src.main:app",
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        backlog=config.SERVER_BACKLOG,
+        timeout_keep_alive=config.SERVER_KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY,
+        proxy_headers=True,
+        forwarded_allow_ips=config.SERVER_FORWARDED_ALLOW_IPS,
+        access_log=config.SERVER_ACCESS_LOG,
+        log_level=config.LOGGING_LEVEL.lower(),
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,48 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.place import importer
+from src.place.importer import iter_json_elements
+
+
+def dump(elements: list[dict]) -> str:
+    return json.dumps({"version": 0.6, "generator": "Overpass API", "elements": elements})
+
+
+ELEMENTS = [
+    {"type": "node", "id": n, "lat": 51.5 + n / 1000, "lon": -0.12, "tags": {"name": f"Place {n}", "amenity": "cafe"}}
+    for n in range(50)
+]
+
+
+def test_small_dump():
+    elements = list(iter_json_elements(io.StringIO(dump(ELEMENTS[:1]))))
+    assert [element["id"] for element in elements] == [0]
+    assert elements[0]["lat"] == Decimal("51.5")
+
+
+def test_empty_elements():
+    assert list(iter_json_elements(io.StringIO('{"elements": []}'))) == []
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 100, 1000])
+def test_chunk_boundaries(monkeypatch, read_size):
+    # the opener and the elements land in every possible position relative to the chunks,
+    # including the opener in the last chunk of the file
+    monkeypatch.setattr(importer, "READ_SIZE", read_size)
+    elements = list(iter_json_elements(io.StringIO(dump(ELEMENTS))))
+    assert [element["id"] for element in elements] == list(range(len(ELEMENTS)))
+
+
+def test_truncated_dump():
+    with pytest.raises(ValueError):
+        list(iter_json_elements(io.StringIO(dump(ELEMENTS)[:-40])))
+
+
+def test_opener_in_last_chunk(monkeypatch):
+    text = json.dumps({"generator": "x" * 100, "elements": [{"type": "node", "id": 1}]})
+    monkeypatch.setattr(importer, "READ_SIZE", 100)
+    assert [element["id"] for element in iter_json_elements(io.StringIO(text))] == [1]